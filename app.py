@@ -1,37 +1,67 @@
 import streamlit as st
 import pandas as pd
 
-# Modular Imports
+# Modular Imports: only what every rerun needs. Workflow steps import their
+# module on first use, so plotting/profiling libraries stay out of cold start.
 from data_loader import upload_file
-from data_info import show_basic_info, get_null_report
-from data_reshaper import reshape_logic
-from data_cleaner import apply_cleaning
-from data_transformer import change_datatypes
-from data_pivot_table import create_pivot_table
-from data_discovery import filter_data, group_data, run_automated_discovery
-from data_viz import run_eda
+from data_jobs import deliver_jobs, jobs_panel, submit_job
+from data_pipeline import Pipeline, describe, parse_log, run_operation
+from data_export import export_panel
+from data_diagnostics import diagnostics_panel, measure, session_trace
 
 st.set_page_config(page_title="Analytica", layout="wide", page_icon="👨‍💻")
 
-def update_df(new_df):
-    """Handles state history and updates the main dataframe."""
-    if "history" not in st.session_state:
-        st.session_state.history = []
-    st.session_state.history.append(st.session_state.main_df.copy())
-    if len(st.session_state.history) > 5:
-        st.session_state.history.pop(0)
-    st.session_state.main_df = new_df
+def sync_df():
+    """Points main_df at the frame under the pipeline cursor."""
+    st.session_state.main_df = st.session_state.pipeline.current
+
+def update_df(op):
+    """Records an operation in the pipeline log and updates the main dataframe."""
+    try:
+        st.session_state.pipeline.apply(op)
+    except Exception as e:
+        st.error(f"{describe(op)} failed: {e}")
+        return
+    sync_df()
     st.rerun()
 
+def update_df_in_background(op):
+    """Runs a slow operation as a job; the pipeline records it once the result is back."""
+    from data_backend import is_out_of_core
+    pipeline, version = st.session_state.pipeline, st.session_state.pipeline.version
+    def record(result):
+        if st.session_state.get("pipeline") is not pipeline or pipeline.version != version:
+            raise RuntimeError("the data changed while it was running. Please run it again.")
+        pipeline.apply(op, result=result)
+        sync_df()
+    # Out-of-core results are files owned by this process, so those run on a thread
+    submit_job("operation", run_operation, st.session_state.main_df, op, label=describe(op),
+               on_done=record, threads=is_out_of_core(st.session_state.main_df))
+    st.rerun()
+
+def eda_frame(df):
+    """Charts and profiles need rows in memory: out-of-core data is sampled first."""
+    from data_backend import is_out_of_core, sample_frame
+    if is_out_of_core(df):
+        sample = sample_frame(df)
+        st.info(f"🦆 Out-of-core data: working on a {len(sample):,}-row random sample of {len(df):,} rows.")
+        return sample
+    return df
+
 def main():
     st.title("🔍 Analytica: Data Analysis & Discovery Tool")
     
     df_input = upload_file()
 
     if df_input is not None:
-        if "main_df" not in st.session_state:
-            st.session_state.main_df = df_input
-            st.session_state.history = []
+        # A new upload starts a fresh operation log
+        if "pipeline" not in st.session_state or st.session_state.pipeline.base is not df_input:
+            st.session_state.pipeline = Pipeline(df_input)
+            sync_df()
+        pipeline = st.session_state.pipeline
+        # Results of background jobs that finished since the last run
+        for error in deliver_jobs():
+            st.error(error)
 
         with st.sidebar:
             st.caption("Engine v1.5")
@@ -44,125 +74,177 @@ def main():
                 "4. Type Conversion", 
                 "5. Pivot Table", 
                 "6. Filtering & Grouping", 
-                "7. Visual EDA",
-                "8. Automated AI Report"
+                "7. Statistics",
+                "8. Visual EDA",
+                "9. Automated AI Report"
             ]
             
             st.markdown("### 🛠️ Workflow")
             menu = st.radio("Navigate:", steps, label_visibility="collapsed")
+            jobs_panel()
             
             st.divider()
-            c1, c2 = st.columns(2)
-            if c1.button("↩️ Undo"):
-                if st.session_state.history:
-                    st.session_state.main_df = st.session_state.history.pop()
-                    st.rerun()
-            if c2.button("♻️ Reset"):
-                st.session_state.main_df = df_input
-                st.session_state.history = []
+            c1, c2, c3 = st.columns(3)
+            if c1.button("↩️ Undo", disabled=pipeline.cursor == 0):
+                pipeline.undo()
+                sync_df()
+                st.rerun()
+            if c2.button("↪️ Redo", disabled=pipeline.cursor == len(pipeline.steps)):
+                pipeline.redo()
+                sync_df()
                 st.rerun()
+            if c3.button("♻️ Reset"):
+                pipeline.reset()
+                sync_df()
+                st.rerun()
+
+            # Jump to any step; frames are rebuilt from the nearest checkpoint
+            with st.expander("🧾 Pipeline Log"):
+                labels = pipeline.labels()
+                target = st.selectbox("Jump to step:", range(len(labels)), index=pipeline.cursor,
+                                      format_func=lambda i: labels[i])
+                if target != pipeline.cursor and st.button("⏩ Go to Step", use_container_width=True):
+                    pipeline.goto(target)
+                    sync_df()
+                    st.rerun()
+
+                st.download_button(
+                    label="📤 Export Log (JSON)",
+                    data=pipeline.to_json(),
+                    file_name="analytica_pipeline.json",
+                    mime="application/json",
+                    use_container_width=True
+                )
+                log_file = st.file_uploader("Replay a log on this file:", type=["json"], key="log_upload")
+                if log_file is not None and st.button("▶️ Replay Log", use_container_width=True):
+                    try:
+                        for op in parse_log(log_file.getvalue()):
+                            pipeline.apply(op)
+                    except Exception as e:
+                        st.error(f"Replay failed: {e}")
+                    sync_df()
+                    st.rerun()
             st.divider()
             st.markdown("### 💾 Export Progress")
             
-            # Pre-calculate CSV
-            csv_data = st.session_state.main_df.to_csv(index=False).encode('utf-8')
+            # Serialized only on request, then reused until the data changes
+            export_panel(st.session_state.main_df, pipeline.version)
+
+        # Navigation Switcher (timed per step for the diagnostics panel)
+        with measure(menu, kind="step"):
+            if menu == "1. Data Overview":
+                from data_info import show_basic_info
+                show_basic_info(st.session_state.main_df)
+
+            elif menu == "2. Reshape Data":
+                from data_reshaper import reshape_logic
+                op = reshape_logic(st.session_state.main_df, pipeline.version)
+                if op is not None:
+                    update_df_in_background(op)
+
+            elif menu == "3. Cleaning Center":
+                from data_info import get_null_report
+                from data_cleaner import STRATEGIES, cleaning_plan_editor, count_duplicates
+                st.header("🛠️ Cleaning Center")
             
-            st.download_button(
-                label="📥 Download CSV",
-                data=csv_data,
-                file_name="analytica_processed_data.csv",
-                mime="text/csv",
-                use_container_width=True
-            )
-
-        # Navigation Switcher
-        if menu == "1. Data Overview":
-            show_basic_info(st.session_state.main_df)
-
-        elif menu == "2. Reshape Data":
-            new_df = reshape_logic(st.session_state.main_df)
-            if not new_df.equals(st.session_state.main_df):
-                update_df(new_df)
-
-        elif menu == "3. Cleaning Center":
-            st.header("🛠️ Cleaning Center")
+                # 1. Identify current nulls
+                null_cols = get_null_report(st.session_state.main_df, pipeline.fingerprint)
             
-            # 1. Identify current nulls
-            null_cols = get_null_report(st.session_state.main_df)
-            
-            # 2. Case: The data has nulls to be fixed
-            if null_cols:
-                col_fix = st.selectbox("Select Column to Clean:", null_cols)
-                mode = st.selectbox("Strategy:", ["Delete Row", "Forward Fill", "Backward Fill", "Fill with Mean"])
+                # 2. Case: The data has nulls to be fixed
+                if null_cols:
+                    col_fix = st.selectbox("Select Column to Clean:", null_cols)
+                    mode = st.selectbox("Strategy:", STRATEGIES)
+                    params = {"column": col_fix, "strategy": mode}
+                    if mode == "Fill with Constant":
+                        params["value"] = st.text_input("Fill Value:")
+                    elif mode == "Group-wise Fill":
+                        params["by"] = st.selectbox("Group By:", [c for c in st.session_state.main_df.columns if c != col_fix])
                 
-                if st.button("Execute Clean"):
-                    cleaned_df = apply_cleaning(st.session_state.main_df, col_fix, mode)
-                    
-                    if cleaned_df[col_fix].dtype == 'object':
-                        cleaned_df[col_fix] = cleaned_df[col_fix].astype(str)
-                    
-                    # Store message and mark that we JUST cleaned something
-                    st.session_state.last_cleaned_msg = f"✅ Column '{col_fix}' has been cleaned using {mode}."
-                    st.session_state.just_finished_action = True
+                    if st.button("Execute Clean"):
+                        # Store message and mark that we JUST cleaned something
+                        st.session_state.last_cleaned_msg = f"✅ Column '{col_fix}' has been cleaned using {mode}."
+                        st.session_state.just_finished_action = True
                     
-                    update_df(cleaned_df)
-
-            # 3. Case: Data is clean (either from the start or just finished)
-            else:
-                # Only show "No missing values found" if we DIDN'T just finish a cleaning action
-                if not st.session_state.get("just_finished_action", False):
-                    st.success("✨ No missing values!")
-                else:
-                    # If we just finished, show the final completion message instead
-                    st.success("Data is now Cleaned.")
-                    # Reset the flag so if they leave and come back, it shows the "No missing values" message
-                    st.session_state.just_finished_action = False
+                        update_df({"op": "clean", "params": params})
 
-            # Display individual column success message if it exists
-            if "last_cleaned_msg" in st.session_state:
-                st.success(st.session_state.last_cleaned_msg)
-                del st.session_state.last_cleaned_msg
+                    st.divider()
+                    op = cleaning_plan_editor(st.session_state.main_df, null_cols)
+                    if op is not None:
+                        st.session_state.last_cleaned_msg = f"✅ {len(op['params']['plan'])} columns cleaned in one pass."
+                        st.session_state.just_finished_action = True
+                        update_df(op)
 
-            st.divider()
+                # 3. Case: Data is clean (either from the start or just finished)
+                else:
+                    # Only show "No missing values found" if we DIDN'T just finish a cleaning action
+                    if not st.session_state.get("just_finished_action", False):
+                        st.success("✨ No missing values!")
+                    else:
+                        # If we just finished, show the final completion message instead
+                        st.success("Data is now Cleaned.")
+                        # Reset the flag so if they leave and come back, it shows the "No missing values" message
+                        st.session_state.just_finished_action = False
+
+                # Display individual column success message if it exists
+                if "last_cleaned_msg" in st.session_state:
+                    st.success(st.session_state.last_cleaned_msg)
+                    del st.session_state.last_cleaned_msg
+
+                st.divider()
             
-            # --- DUPLICATE HANDLING ---
-            st.subheader("👯 Duplicate Handling")
-            dupes = st.session_state.main_df.duplicated().sum()
+                # --- DUPLICATE HANDLING ---
+                st.subheader("👯 Duplicate Handling")
+                dupes = count_duplicates(st.session_state.main_df, pipeline.fingerprint)
             
-            if dupes > 0:
-                st.warning(f"Found {dupes} duplicate rows.")
-                if st.button(f"Remove {dupes} Duplicates"):
-                    new_df = st.session_state.main_df.drop_duplicates().reset_index(drop=True)
-                    update_df(new_df)
-                    st.success(f"✅ {dupes} duplicate rows removed successfully.")
-            else:
-                st.info("No duplicate rows found.")
-
-        elif menu == "4. Type Conversion":
-            new_df = change_datatypes(st.session_state.main_df)
-            if not new_df.equals(st.session_state.main_df):
-                update_df(new_df)
-
-        elif menu == "5. Pivot Table":
-            create_pivot_table(st.session_state.main_df)
-
-        elif menu == "6. Filtering & Grouping":
-            t1, t2 = st.tabs(["🎯 Row Filtering", "🧮 Aggregation"])
-            with t1: filter_data(st.session_state.main_df)
-            with t2: group_data(st.session_state.main_df)
-
-        elif menu == "7. Visual EDA":
-            run_eda(st.session_state.main_df)
-
-        elif menu == "8. Automated AI Report":
-            run_automated_discovery(st.session_state.main_df)
+                if dupes > 0:
+                    st.warning(f"Found {dupes} duplicate rows.")
+                    if st.button(f"Remove {dupes} Duplicates"):
+                        update_df({"op": "dedupe"})
+                        st.success(f"✅ {dupes} duplicate rows removed successfully.")
+                else:
+                    st.info("No duplicate rows found.")
+
+            elif menu == "4. Type Conversion":
+                from data_transformer import change_datatypes
+                op = change_datatypes(st.session_state.main_df, pipeline.version)
+                if op is not None:
+                    update_df(op)
+
+            elif menu == "5. Pivot Table":
+                from data_pivot_table import create_pivot_table
+                create_pivot_table(st.session_state.main_df, pipeline.version)
+
+            elif menu == "6. Filtering & Grouping":
+                from data_discovery import filter_data, group_data
+                t1, t2 = st.tabs(["🎯 Row Filtering", "🧮 Aggregation"])
+                with t1: filter_data(st.session_state.main_df, pipeline.fingerprint)
+                with t2: group_data(st.session_state.main_df, pipeline.version)
+
+            elif menu == "7. Statistics":
+                from data_stats import show_stats, show_correlations
+                frame = eda_frame(st.session_state.main_df)
+                show_stats(frame, pipeline.version)
+                st.divider()
+                show_correlations(frame, pipeline.version)
+
+            elif menu == "8. Visual EDA":
+                from data_viz import run_eda
+                run_eda(eda_frame(st.session_state.main_df), pipeline.version)
+
+            elif menu == "9. Automated AI Report":
+                from data_discovery import run_automated_discovery
+                run_automated_discovery(eda_frame(st.session_state.main_df), pipeline.version)
+
+        with st.sidebar:
+            diagnostics_panel()
 
     else:
         st.info("👋 Welcome! Please upload your CSV or Excel file to begin.")
 
 if __name__ == "__main__":
 
-    main()
+    with session_trace():
+        main()
 
 
 
@@ -0,0 +1,165 @@
+"""Correctness checks for data shapes that broke the fast paths before.
+
+Each check builds a small frame, runs one optimized path and compares it with
+plain pandas. `python benchmarks/workflow.py --check` runs them too:
+
+    python benchmarks/regressions.py
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CHECKS = []
+# Largest difference from DataFrame.corr the correlation matrix may show
+CORR_TOLERANCE = 1e-4
+
+def check(func):
+    CHECKS.append(func)
+    return func
+
+@check
+def duplicate_count_with_nullable_na():
+    """Repeated rows holding pd.NA in Int64 and string[pyarrow] columns (compacted data)."""
+    from data_metrics import _same, duplicate_count
+    from data_version import DatasetVersion
+    df = pd.DataFrame({"i": pd.array([1, None, 1, None, 2], dtype="Int64"),
+                       "s": pd.array(["a", None, "a", None, "b"], dtype="string[pyarrow]")})
+    got = duplicate_count(df, DatasetVersion.initial(df))
+    assert got == df.duplicated().sum(), f"{got} duplicates, pandas finds {df.duplicated().sum()}"
+    # The collision check itself: NA against a value is a difference, NA against NA is not
+    rows, leaders = np.array([1, 3]), np.array([0, 1])
+    assert not _same(df["i"], rows, leaders) and not _same(df["s"], rows, leaders)
+    assert _same(df["i"], np.array([3]), np.array([1])) and _same(df["s"], np.array([3]), np.array([1]))
+
+@check
+def pivot_preview_stays_small():
+    """An id x text pivot (30k distinct keys each) previews without building the dense table."""
+    from data_aggregator import AggregationCube
+    from data_reshaper import PREVIEW_ROWS, pivot_preview
+    rng = np.random.default_rng(0)
+    rows = 30_000
+    df = pd.DataFrame({"id": np.arange(rows), "text": [f"t{i}" for i in rng.integers(0, rows, rows)],
+                       "v": rng.normal(size=rows)})
+    preview, (n_rows, _) = pivot_preview(AggregationCube(), df, "check", "id", "text", "v", "mean")
+    assert len(preview) == PREVIEW_ROWS and n_rows == rows, f"preview {preview.shape} of {n_rows} rows"
+    small = df.head(200).assign(text=lambda d: d["text"].str[:2])
+    preview, _ = pivot_preview(AggregationCube(), small, "check", "text", "id", "v", "sum")
+    expected = small.pivot_table(index="text", columns="id", values="v", aggfunc="sum")
+    pd.testing.assert_frame_equal(preview["v"], expected.iloc[:PREVIEW_ROWS, :preview.shape[1]], check_names=False)
+
+@check
+def out_of_core_compact_then_undo():
+    """'compact' on out-of-core data returns its input; dropping that step must keep the file."""
+    import tempfile
+    from data_backend import DUCKDB_AVAILABLE, OutOfCoreFrame
+    from data_pipeline import Pipeline
+    if not DUCKDB_AVAILABLE:
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.csv")
+        pd.DataFrame({"a": np.arange(100) % 7, "b": np.arange(100)}).to_csv(path, index=False)
+        pipeline = Pipeline(OutOfCoreFrame.from_file(path))
+        pipeline.apply({"op": "compact"})
+        pipeline.apply({"op": "dedupe"})
+        pipeline.apply({"op": "compact"})
+        pipeline.goto(1)
+        pipeline.apply({"op": "convert", "params": {"column": "a", "new_type": "float64"}})
+        pipeline.undo()
+        assert len(pipeline.current.head()) == 5
+        pipeline.reset()
+        assert len(pipeline.current.head()) == 5 and len(pipeline.base.head()) == 5
+
+@check
+def export_with_null_leading_chunk():
+    """Columns that are all null in the first export chunk and filled later."""
+    import io
+    from data_export import export_frame
+    df = pd.DataFrame({"text": [None] * 150 + ["x"] * 100, "number": [np.nan] * 150 + [1.5] * 100,
+                       "count": pd.array([None] * 150 + [3] * 100, dtype="Int8")})
+    for fmt, read in (("Parquet", pd.read_parquet), ("Feather", pd.read_feather)):
+        back = read(io.BytesIO(export_frame(df, fmt, chunk_rows=100)))
+        pd.testing.assert_frame_equal(back, df, obj=fmt)
+
+@check
+def correlation_on_offset_data():
+    """Columns near 1e9 with nulls: raw-sum Pearson formulas cancel catastrophically there."""
+    from data_compute import correlation
+    from data_profiler import profile_frame
+    rng = np.random.default_rng(0)
+    rows = 10_000
+    base = rng.normal(size=rows)
+    df = pd.DataFrame({"a": 1e9 + base, "b": 1e9 + base + 0.5 * rng.normal(size=rows),
+                       "c": 5 + 1e-6 * rng.normal(size=rows), "d": rng.normal(size=rows)})
+    df.loc[::5, "b"] = np.nan
+    df.loc[::7, "a"] = np.nan
+    expected = df.corr()
+    for name, result in (("correlation", correlation(df)), ("profile", profile_frame(df)["correlations"])):
+        pd.testing.assert_frame_equal(result, expected, atol=CORR_TOLERANCE, obj=name)
+
+@check
+def csv_types_do_not_depend_on_file_count():
+    """A CSV uploaded alone or with others parses to the same frame (strings, dates, leading zeros)."""
+    import io
+    from data_loader import _parse_part, read_csv_chunked
+    text = b"code,when,amount\n007,2024-01-05,1.5\n012,2024-02-01,\nabc,2024-03-09,2\n"
+    alone = read_csv_chunked(io.BytesIO(text))[0]
+    upload = io.BytesIO(text)
+    upload.name = "part.csv"
+    [(_, together)] = _parse_part(upload, all_sheets=False, max_rows=None)
+    pd.testing.assert_frame_equal(together, alone)
+
+@check
+def shared_load_runs_once_per_key():
+    """Sessions opening the same upload while idle copies of it are dropped never parse it side by side."""
+    import tempfile
+    import threading
+    from data_shared import SessionToken, SharedDatasetStore
+    parsing, overlaps = [0], []
+    guard = threading.Lock()
+    def load():
+        with guard:
+            parsing[0] += 1
+            overlaps.append(parsing[0])
+        threading.Event().wait(0.0005)
+        with guard:
+            parsing[0] -= 1
+        return {"df": pd.DataFrame({"a": np.arange(10)})}
+    with tempfile.TemporaryDirectory() as tmp:
+        # No memory or disk budget: every release forgets the entry and its lock may go too
+        store = SharedDatasetStore(budget=0, root=tmp, disk_budget=0)
+        def session():
+            token = SessionToken()
+            for _ in range(200):
+                store.acquire("upload", token, load)
+                store.release(token)
+        threads = [threading.Thread(target=session) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert max(overlaps) == 1, f"{max(overlaps)} parses of one key ran at once"
+
+def failures():
+    """'<check>: <problem>' for every check that fails."""
+    found = []
+    for func in CHECKS:
+        try:
+            func()
+        except Exception as e:
+            found.append(f"{func.__name__}: {type(e).__name__}: {e}")
+    return found
+
+def main():
+    found = failures()
+    for failure in found:
+        print(f"FAILED: {failure}")
+    print(f"{len(CHECKS) - len(found)} of {len(CHECKS)} checks passed")
+    sys.exit(1 if found else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Cold-start benchmark for the Streamlit entry point.
+
+Each measurement runs in a fresh interpreter so nothing is already imported:
+
+    python benchmarks/startup.py            # report import cost per module
+    python benchmarks/startup.py --check    # fail if app.py breaks the cold-start budget
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds allowed for `import app` (everything the first page view needs)
+COLD_START_BUDGET = 3.0
+REPEATS = 3
+
+MODULES = [
+    "data_loader", "data_pipeline", "data_export", "data_info", "data_reshaper",
+    "data_cleaner", "data_transformer", "data_pivot_table", "data_discovery",
+    "data_viz", "data_profiler", "app",
+]
+# Libraries that must not be loaded until a workflow step asks for them
+DEFERRED = ["seaborn", "matplotlib", "plotly.express", "ydata_profiling"]
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+{preload}
+base = time.perf_counter()
+import {module}
+end = time.perf_counter()
+print(json.dumps({{"base": base - start, "module": end - base,
+                   "loaded": sorted(m for m in {deferred!r} if m in sys.modules)}}))
+"""
+
+def measure(module, preload="import streamlit, pandas"):
+    """Median import time of `module` in fresh interpreters, on top of `preload`."""
+    runs = []
+    for _ in range(REPEATS):
+        code = PROBE.format(root=ROOT, preload=preload, module=module, deferred=DEFERRED)
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                             cwd=ROOT, check=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    runs.sort(key=lambda r: r["module"])
+    return runs[len(runs) // 2]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="exit non-zero when the budget is exceeded")
+    parser.add_argument("--budget", type=float, default=COLD_START_BUDGET, help="cold-start budget in seconds")
+    args = parser.parse_args()
+
+    print(f"{'module':<20}{'import (s)':>12}  deferred libraries loaded")
+    for module in MODULES:
+        result = measure(module)
+        print(f"{module:<20}{result['module']:>12.3f}  {', '.join(result['loaded']) or '-'}")
+
+    # Cold start: nothing preloaded, the whole entry point
+    cold = measure("app", preload="")
+    total = cold["base"] + cold["module"]
+    print(f"\nCold start (import app): {total:.3f}s, budget {args.budget:.1f}s")
+
+    failures = []
+    if total > args.budget:
+        failures.append(f"cold start {total:.3f}s exceeds budget {args.budget:.1f}s")
+    if cold["loaded"]:
+        failures.append(f"app.py eagerly imports {', '.join(cold['loaded'])}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if args.check and failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Workflow benchmark: wall time and peak memory of every step on synthetic data.
+
+Each dataset is generated from a fixed seed, so runs are comparable:
+
+    python benchmarks/workflow.py                  # quick scale: 10k and 100k rows
+    python benchmarks/workflow.py --scale full     # 10k to 10M rows (needs several GB of RAM)
+    python benchmarks/workflow.py --save           # store the results as the baseline
+    python benchmarks/workflow.py --check          # fail when a step regressed against the baseline
+
+Wall time is the median of --repeats runs with cold caches (every run gets a
+fresh dataset version); peak memory comes from one extra run under
+tracemalloc, which sees numpy and pandas buffers but not Arrow's own pool.
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data_aggregator import AggregationCube
+from data_compute import correlation
+from data_discovery import build_profile, stratified_sample
+from data_index import filter_positions, index_cache
+from data_loader import read_csv_chunked
+from data_metrics import duplicate_count, metrics_cache, null_counts
+from data_operations import (apply_cleaning_plan, default_plan, melt_frame, pivot_frame,
+                             remove_duplicates, summary_pivot)
+from data_version import DatasetVersion
+from data_viz import render_png
+from regressions import failures as regression_failures
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SCALES = {
+    "quick": [10_000, 100_000],
+    "standard": [10_000, 100_000, 1_000_000],
+    "full": [10_000, 100_000, 1_000_000, 10_000_000],
+}
+# (name, width, cardinality of cat0, null ratio)
+DATASETS = [
+    ("narrow-low", "narrow", "low", 0.05),
+    ("narrow-high", "narrow", "high", 0.20),
+    ("wide-low", "wide", "low", 0.05),
+]
+WIDTHS = {"narrow": (4, 2), "wide": (180, 20)}  # (numeric, categorical) columns
+WIDE_MAX_ROWS = 1_000_000
+DUPLICATE_RATIO = 0.01
+REPEATS = 3
+
+# A step is slower only if it exceeds the baseline by both the ratio and the floor
+TIME_TOLERANCE = 1.5
+TIME_FLOOR = 0.05
+MEMORY_TOLERANCE = 1.25
+MEMORY_FLOOR_MB = 8.0
+
+def make_dataset(rows, width="narrow", cardinality="low", null_ratio=0.05, seed=0):
+    """Synthetic table: an id, normal floats, string categories, dates, nulls and a few duplicate rows.
+
+    cat0 has 10 levels ("low") or rows / 10 levels ("high"); every other
+    category has 10 levels. Each cell except the id is null with probability
+    `null_ratio`.
+    """
+    rng = np.random.default_rng(seed)
+    numeric, categorical = WIDTHS[width]
+    data = {"id": np.arange(rows)}
+    for i in range(numeric):
+        data[f"num{i}"] = rng.normal(size=rows)
+    for i in range(categorical):
+        levels = max(rows // 10, 10) if i == 0 and cardinality == "high" else 10
+        labels = np.array([f"c{j}" for j in range(levels)], dtype=object)
+        data[f"cat{i}"] = labels[rng.integers(0, levels, rows)]
+    data["date"] = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 3650, rows), unit="D")
+    df = pd.DataFrame(data)
+    for col in df.columns[1:]:
+        df[col] = df[col].mask(rng.random(rows) < null_ratio)
+    # The last rows repeat the first ones exactly, so dedupe has work to do
+    order = np.arange(rows)
+    copies = int(rows * DUPLICATE_RATIO)
+    order[rows - copies:] = np.arange(copies)
+    return df.iloc[order].reset_index(drop=True)
+
+class Context:
+    """The dataset under test, its CSV file and the columns the steps use."""
+
+    def __init__(self, df, path):
+        self.df = df
+        self.path = path
+        self.numeric = [c for c in df.columns if c.startswith("num")]
+        self.null_columns = df.columns[df.isna().any()].tolist()
+
+    @property
+    def version(self):
+        # A fresh version per run, so per-version caches start cold
+        return DatasetVersion.initial(self.df)
+
+def _load(ctx):
+    with open(ctx.path, "rb") as f:
+        return read_csv_chunked(f)
+
+def _density(ctx):
+    import matplotlib.pyplot as plt
+    from data_density import draw_density
+    def draw():
+        fig, ax = plt.subplots()
+        draw_density(ax, ctx.df, "num0", "num1")
+        return fig
+    return render_png(draw)
+
+# (step, module it exercises, function of the context)
+STEPS = [
+    ("load csv", "data_loader", _load),
+    ("null counts", "data_info", lambda ctx: null_counts(ctx.df, ctx.version)),
+    ("duplicate count", "data_cleaner", lambda ctx: duplicate_count(ctx.df, ctx.version)),
+    ("clean all", "data_cleaner", lambda ctx: apply_cleaning_plan(ctx.df, default_plan(ctx.df, ctx.null_columns))),
+    ("dedupe", "data_cleaner", lambda ctx: remove_duplicates(ctx.df)),
+    ("melt", "data_reshaper", lambda ctx: melt_frame(ctx.df, ["id"], ctx.numeric, "variable", "value")),
+    ("pivot", "data_reshaper", lambda ctx: pivot_frame(ctx.df, "cat0", "cat1", "num0", "mean")),
+    ("summary", "data_pivot_table", lambda ctx: summary_pivot(ctx.df, ["cat0"], ["cat1"], ["num0", "num1"], "mean")),
+    ("summary (cube)", "data_pivot_table",
+     lambda ctx: AggregationCube().pivot(ctx.df, ctx.version.key, ["cat0"], ["cat1"], ["num0", "num1"], "mean")),
+    ("filter", "data_discovery",
+     lambda ctx: filter_positions(ctx.df, ctx.version, {"num0": (-0.5, 0.5), "cat1": ["c1", "c2"]})),
+    ("stratified sample", "data_discovery", lambda ctx: stratified_sample(ctx.df, 10_000, by="cat1")),
+    ("minimal profile", "data_discovery", lambda ctx: build_profile(ctx.df, minimal=True)),
+    ("correlation", "data_viz", lambda ctx: correlation(ctx.df)),
+    ("density chart", "data_viz", _density),
+]
+
+def _clear_caches():
+    metrics_cache().clear()
+    index_cache().clear()
+    gc.collect()
+
+def measure(func, ctx, repeats=REPEATS):
+    """Median seconds over `repeats` runs, and peak traced MB of one more run."""
+    times = []
+    for _ in range(repeats):
+        _clear_caches()
+        start = time.perf_counter()
+        func(ctx)
+        times.append(time.perf_counter() - start)
+    _clear_caches()
+    tracemalloc.start()
+    try:
+        func(ctx)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": statistics.median(times), "peak_mb": peak / 1024 ** 2}
+
+def cases(scale):
+    for rows in SCALES[scale]:
+        for name, width, cardinality, nulls in DATASETS:
+            if width == "wide" and rows > WIDE_MAX_ROWS:
+                continue
+            yield name, rows, (width, cardinality, nulls)
+
+def run(scale, repeats, steps=None):
+    """{"<dataset>/<rows>/<step>": {"seconds", "peak_mb"}} for every case and step, printed as it goes."""
+    results = {}
+    print(f"{'dataset':<14}{'rows':>12}  {'step':<20}{'module':<18}{'seconds':>10}{'peak MB':>10}")
+    with tempfile.TemporaryDirectory(prefix="analytica_bench_") as tmp:
+        for name, rows, params in cases(scale):
+            df = make_dataset(rows, *params)
+            path = os.path.join(tmp, f"{name}_{rows}.csv")
+            df.to_csv(path, index=False)
+            ctx = Context(df, path)
+            for step, module, func in STEPS:
+                if steps and step not in steps:
+                    continue
+                result = measure(func, ctx, 1 if rows >= 1_000_000 else repeats)
+                results[f"{name}/{rows}/{step}"] = result
+                print(f"{name:<14}{rows:>12,}  {step:<20}{module:<18}{result['seconds']:>10.3f}{result['peak_mb']:>10.1f}")
+            del ctx, df
+            os.remove(path)
+            _clear_caches()
+    return results
+
+def compare(results, baseline):
+    """Regression messages for results slower or hungrier than the baseline."""
+    failures = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result["seconds"] > base["seconds"] * TIME_TOLERANCE and result["seconds"] - base["seconds"] > TIME_FLOOR:
+            failures.append(f"{key}: {result['seconds']:.3f}s vs baseline {base['seconds']:.3f}s")
+        if result["peak_mb"] > base["peak_mb"] * MEMORY_TOLERANCE \
+                and result["peak_mb"] - base["peak_mb"] > MEMORY_FLOOR_MB:
+            failures.append(f"{key}: {result['peak_mb']:.1f} MB vs baseline {base['peak_mb']:.1f} MB")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(SCALES), default="quick", help="row counts to run")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="timed runs per step (1 from 1M rows up)")
+    parser.add_argument("--steps", nargs="+", metavar="STEP", help="only these steps, e.g. melt pivot")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline file to compare with or save to")
+    parser.add_argument("--save", action="store_true", help="merge these results into the baseline")
+    parser.add_argument("--check", action="store_true",
+                        help="exit non-zero on regressions (and on failing benchmarks/regressions.py checks)")
+    args = parser.parse_args()
+
+    results = run(args.scale, args.repeats, args.steps)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    failures = compare(results, baseline)
+    if args.check:
+        failures += regression_failures()
+    missing = [key for key in results if key not in baseline]
+    print(f"\n{len(results) - len(missing)} of {len(results)} measurements compared with {args.baseline}")
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+
+    if args.save:
+        baseline.update({key: {k: round(v, 4) for k, v in r.items()} for key, r in results.items()})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(baseline.items())), f, indent=1)
+            f.write("\n")
+        print(f"Saved {len(results)} measurements to {args.baseline}")
+    if args.check and failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_cache import LRUCache
+from data_diagnostics import timed
+
+# Per group and value column: count, sum, M2 (centred sum of squares), min, max
+STATS = ("count", "sum", "m2", "min", "max")
+AGGFUNCS = ("sum", "mean", "count", "min", "max", "std", "var")
+
+def supports(df, values):
+    """The cube handles numeric (and boolean) value columns; anything else goes to pandas."""
+    return all(pd.api.types.is_numeric_dtype(df[v]) for v in values)
+
+def sufficient_stats(df, keys, values):
+    """One pass over the rows: STATS per group of `keys` for every value column."""
+    grouped = df.groupby(list(keys), observed=True, sort=True)[list(values)]
+    stats = grouped.agg(["count", "sum", "min", "max"])
+    m2 = grouped.var(ddof=0).fillna(0.0) * grouped.count()
+    for v in values:
+        stats[(v, "m2")] = m2[v]
+    return stats[[(v, s) for v in values for s in STATS]]
+
+def roll_up(stats, keys):
+    """Merges finer groups into a coarser grouping without touching the rows."""
+    keys = list(keys)
+    def by(series):
+        return series.groupby(level=keys, observed=True, sort=True)
+    out = {}
+    for v in stats.columns.get_level_values(0).unique():
+        n, total = stats[(v, "count")], stats[(v, "sum")]
+        group_mean = by(total).transform("sum") / by(n).transform("sum")
+        # Chan et al.: M2 of a union adds each part's spread around the combined mean
+        spread = (n * (total / n - group_mean) ** 2).fillna(0.0)
+        out[(v, "count")] = by(n).sum()
+        out[(v, "sum")] = by(total).sum()
+        out[(v, "m2")] = by(stats[(v, "m2")] + spread).sum()
+        out[(v, "min")] = by(stats[(v, "min")]).min()
+        out[(v, "max")] = by(stats[(v, "max")]).max()
+    return pd.DataFrame(out)
+
+def derive(stats, aggfunc):
+    """Evaluates one aggfunc per value column from sufficient statistics."""
+    if aggfunc not in AGGFUNCS:
+        raise ValueError(f"Unsupported aggregation '{aggfunc}'")
+    out = {}
+    for v in stats.columns.get_level_values(0).unique():
+        n = stats[(v, "count")]
+        if aggfunc in ("count", "sum", "min", "max"):
+            out[v] = stats[(v, aggfunc)]
+        elif aggfunc == "mean":
+            out[v] = stats[(v, "sum")] / n.replace(0, np.nan)
+        else:
+            var = stats[(v, "m2")] / (n - 1).where(n > 1)
+            out[v] = np.sqrt(var) if aggfunc == "std" else var
+    return pd.DataFrame(out, index=stats.index)
+
+def shape_pivot(table, index, columns):
+    """Lays out per-group aggregates (indexed by index + columns in any order) like pivot_table."""
+    if len(index) + len(columns) > 1:
+        table = table.reorder_levels(index + columns).sort_index()
+    if columns:
+        table = table.unstack(columns)
+    return table.dropna(axis=1, how="all").sort_index(axis=1)
+
+class AggregationCube:
+    """Sufficient statistics cached per (dataset version, grouping keys).
+
+    A request is served, in order of preference, from an exact cache hit, by
+    rolling up any cached finer grouping of the same version, or by one
+    groupby over the rows. Every aggfunc in AGGFUNCS derives from the same
+    entry, so switching sum/mean/count never rescans the frame.
+    """
+
+    def __init__(self, max_entries=32, max_bytes=256 * 1024 ** 2):
+        self._cache = LRUCache(max_entries, max_bytes)
+
+    def stats(self, df, version, keys, values):
+        keys, values = tuple(keys), tuple(values)
+        cached = self._cache.get((version, keys, values))
+        if cached is not None:
+            return cached
+        for entry in self._cache.keys():
+            e_version, e_keys, e_values = entry
+            if e_version == version and set(keys) < set(e_keys) and set(values) <= set(e_values):
+                finer = self._cache.get(entry)
+                if finer is not None:
+                    columns = [(v, s) for v in values for s in STATS]
+                    return self._cache.put((version, keys, values), roll_up(finer[columns], keys))
+        return self._cache.put((version, keys, values), sufficient_stats(df, keys, values))
+
+    @timed("Cube aggregate")
+    def aggregate(self, df, version, keys, values, aggfunc):
+        """Same result as df.groupby(keys)[values].agg(aggfunc) (observed groups only)."""
+        return derive(self.stats(df, version, keys, values), aggfunc)
+
+    def pivot(self, df, version, index, columns, values, aggfunc):
+        """Same result as df.pivot_table(index, columns, values, aggfunc)."""
+        index, columns = list(index), list(columns or [])
+        # Canonical key order lets row/column swaps share one cached grouping
+        keys = sorted(index + columns, key=list(df.columns).index)
+        return shape_pivot(self.aggregate(df, version, keys, values, aggfunc), index, columns)
+
+    def clear(self):
+        self._cache.clear()
+
+@st.cache_resource(show_spinner=False)
+def aggregation_cube():
+    """Process-wide cube; entries are keyed by dataset version, so sessions never collide."""
+    return AggregationCube()
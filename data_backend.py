@@ -0,0 +1,378 @@
+import atexit
+import importlib.util
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+
+import pandas as pd
+
+# DuckDB is an optional extra: without it every upload is loaded into pandas
+DUCKDB_AVAILABLE = importlib.util.find_spec("duckdb") is not None
+# Uploads larger than this are spilled to Parquet and queried in place
+OUT_OF_CORE_BYTES = int(os.environ.get("ANALYTICA_OUT_OF_CORE_BYTES", 512 * 1024 ** 2))
+# Server-side folder whose CSV/Parquet files can be opened without uploading (unset = disabled)
+DATA_DIR = os.environ.get("ANALYTICA_DATA_DIR")
+DUCKDB_MEMORY_LIMIT = os.environ.get("ANALYTICA_DUCKDB_MEMORY", "1GB")
+SAMPLE_ROWS = 100_000
+PREVIEW_ROWS = 1_000
+
+AGG_SQL = {"sum": "SUM", "mean": "AVG", "count": "COUNT", "min": "MIN", "max": "MAX",
+           "std": "STDDEV_SAMP", "var": "VAR_SAMP"}
+CAST_SQL = {"int64": "BIGINT", "float64": "DOUBLE", "datetime64[ns]": "TIMESTAMP", "object": "VARCHAR",
+            "string[pyarrow]": "VARCHAR", "Int64": "BIGINT", "Int32": "INTEGER", "Int16": "SMALLINT",
+            "Int8": "TINYINT", "float32": "FLOAT"}
+
+_state = {}
+_lock = threading.Lock()
+
+def _workspace():
+    """Spill directory shared by every out-of-core frame of this process."""
+    with _lock:
+        if "root" not in _state:
+            _state["root"] = tempfile.mkdtemp(prefix="analytica_ooc_")
+            atexit.register(shutil.rmtree, _state["root"], True)
+        return _state["root"]
+
+def _connection():
+    """Process-wide DuckDB database; each query runs on its own cursor."""
+    root = _workspace()
+    with _lock:
+        if "con" not in _state:
+            import duckdb
+            con = duckdb.connect()
+            # Bounded memory; larger sorts, joins and aggregates spill next to the Parquet files
+            con.execute(f"SET memory_limit = '{DUCKDB_MEMORY_LIMIT}'")
+            con.execute(f"SET temp_directory = {_literal(os.path.join(root, 'duckdb'))}")
+            _state["con"] = con
+        return _state["con"].cursor()
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _literal(path):
+    return "'" + path.replace("'", "''") + "'"
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def is_out_of_core(df):
+    return isinstance(df, OutOfCoreFrame)
+
+def should_spill(size_bytes):
+    return DUCKDB_AVAILABLE and size_bytes > OUT_OF_CORE_BYTES
+
+class OutOfCoreFrame:
+    """Read-only table in a Parquet file, queried through DuckDB.
+
+    Exposes the small part of the DataFrame API the workflow steps rely on
+    (columns, dtypes, shape, head, select_dtypes, pivot_table) plus query
+    methods that return pandas results sized by the answer, not the data.
+    Pipeline operations write a new Parquet file and return a new frame.
+    Files the frame wrote itself (from_query) are deleted once it is garbage
+    collected or discard()ed; a frame over someone else's file never deletes it.
+    """
+
+    def __init__(self, path):
+        import pyarrow.parquet as pq
+        self.path = path
+        meta = pq.read_metadata(path)
+        self._rows = meta.num_rows
+        # Zero-row pandas frame of the schema: dtypes and select_dtypes come from it
+        self._empty = meta.schema.to_arrow_schema().empty_table().to_pandas()
+        self.nbytes = os.path.getsize(path)
+        self._samples = {}
+        self._finalizer = None
+
+    @classmethod
+    def from_query(cls, sql, params=None):
+        path = os.path.join(_workspace(), f"{uuid.uuid4().hex}.parquet")
+        try:
+            _connection().execute(f"COPY ({sql}) TO {_literal(path)} (FORMAT PARQUET, COMPRESSION ZSTD)",
+                                  params or [])
+            frame = cls(path)
+        except BaseException:
+            _remove(path)
+            raise
+        frame._finalizer = weakref.finalize(frame, _remove, path)
+        return frame
+
+    def discard(self):
+        """Deletes the frame's spill file now, for a frame nothing will query again."""
+        if self._finalizer is not None:
+            self._finalizer()
+
+    @classmethod
+    def from_csv(cls, path):
+        return cls.from_query(f"SELECT * FROM read_csv_auto({_literal(path)})")
+
+    @classmethod
+    def from_file(cls, path):
+        if path.endswith(".parquet"):
+            return cls.from_query(f"SELECT * FROM read_parquet({_literal(path)})")
+        return cls.from_csv(path)
+
+    # --- DataFrame-like surface ---
+    @property
+    def columns(self):
+        return self._empty.columns
+
+    @property
+    def dtypes(self):
+        return self._empty.dtypes
+
+    @property
+    def shape(self):
+        return (self._rows, len(self.columns))
+
+    def __len__(self):
+        return self._rows
+
+    def select_dtypes(self, include=None, exclude=None):
+        return self._empty.select_dtypes(include=include, exclude=exclude)
+
+    def _source(self, row_number=False):
+        flag = ", file_row_number = true" if row_number else ""
+        return f"read_parquet({_literal(self.path)}{flag})"
+
+    def _query(self, sql, params=None):
+        return _connection().execute(sql, params or []).df()
+
+    def head(self, n=5):
+        return self._query(f"SELECT * FROM {self._source()} LIMIT {int(n)}")
+
+    def sample(self, n=SAMPLE_ROWS, random_state=0):
+        """Reservoir sample; the file never changes, so each size is drawn once."""
+        key = (n, random_state)
+        if key not in self._samples:
+            limit = "" if n >= self._rows else \
+                f" USING SAMPLE reservoir({int(n)} ROWS) REPEATABLE ({int(random_state)})"
+            self._samples[key] = self._query(f"SELECT * FROM {self._source()}{limit}")
+        return self._samples[key]
+
+    # --- Aggregates (results are small, so they come back as pandas) ---
+    def null_counts(self):
+        exprs = ", ".join(f"COUNT(*) - COUNT({_quote(c)})" for c in self.columns)
+        row = self._query(f"SELECT {exprs} FROM {self._source()}").iloc[0].to_numpy()
+        return pd.Series(row, index=self.columns, dtype="int64")
+
+    def duplicate_count(self):
+        return int(self._query(f"SELECT (SELECT COUNT(*) FROM {self._source()}) - "
+                               f"(SELECT COUNT(*) FROM (SELECT DISTINCT * FROM {self._source()}))").iloc[0, 0])
+
+    def bounds(self, column):
+        low, high = self._query(f"SELECT MIN({_quote(column)}), MAX({_quote(column)}) "
+                                f"FROM {self._source()}").iloc[0]
+        return None if pd.isna(low) else (low, high)
+
+    def distinct(self, column, limit=PREVIEW_ROWS):
+        return self._query(f"SELECT DISTINCT {_quote(column)} FROM {self._source()} "
+                           f"LIMIT {int(limit)}").iloc[:, 0].tolist()
+
+    def aggregate(self, keys, values, aggfunc):
+        """Same result as df.groupby(keys)[values].agg(aggfunc)."""
+        if aggfunc not in AGG_SQL:
+            raise ValueError(f"Unsupported aggregation '{aggfunc}'")
+        def agg(v):
+            expr = f"{AGG_SQL[aggfunc]}({_quote(v)})"
+            # pandas sums an all-null group to 0, SQL to NULL
+            return f"COALESCE({expr}, 0)" if aggfunc == "sum" else expr
+        group = ", ".join(_quote(k) for k in keys)
+        aggs = ", ".join(f"{agg(v)} AS {_quote(v)}" for v in values)
+        present = " AND ".join(f"{_quote(k)} IS NOT NULL" for k in keys)
+        table = self._query(f"SELECT {group}, {aggs} FROM {self._source()} WHERE {present} "
+                            f"GROUP BY {group} ORDER BY {group}")
+        return table.set_index(list(keys))
+
+    def pivot_table(self, index, columns=None, values=None, aggfunc="mean"):
+        """Subset of DataFrame.pivot_table: list arguments, one named aggfunc."""
+        from data_aggregator import shape_pivot
+        index, columns = list(index), list(columns or [])
+        return shape_pivot(self.aggregate(index + columns, list(values), aggfunc), index, columns)
+
+    def _where(self, conditions):
+        """SQL predicate and parameters for filter_positions-style conditions."""
+        clauses, params = [], []
+        for col, cond in conditions.items():
+            if isinstance(cond, tuple):
+                clauses.append(f"{_quote(col)} BETWEEN ? AND ?")
+                params += [cond[0], cond[1]]
+            else:
+                wanted = [v for v in cond if not pd.isna(v)]
+                clause = f"list_contains(?, {_quote(col)})"
+                if len(wanted) < len(cond):
+                    clause = f"({clause} OR {_quote(col)} IS NULL)"
+                clauses.append(clause)
+                params.append(wanted)
+        return " AND ".join(clauses) or "TRUE", params
+
+    def match_count(self, conditions):
+        where, params = self._where(conditions)
+        return int(self._query(f"SELECT COUNT(*) FROM {self._source()} WHERE {where}", params).iloc[0, 0])
+
+    def filter(self, conditions, limit=PREVIEW_ROWS, offset=0, sort=None, ascending=True):
+        """`limit` matching rows from `offset`, in file order or by `sort` (nulls last, ties in file order)."""
+        where, params = self._where(conditions)
+        order = "file_row_number"
+        if sort is not None:
+            order = f"{_quote(sort)} {'ASC' if ascending else 'DESC'} NULLS LAST, {order}"
+        rows = self._query(f"SELECT * EXCLUDE (file_row_number) FROM {self._source(row_number=True)} "
+                           f"WHERE {where} ORDER BY {order} LIMIT {int(limit)} OFFSET {int(offset)}", params)
+        return rows
+
+    # --- Pipeline operations (each returns a new frame) ---
+    def run_operation(self, op):
+        p = op.get("params", {})
+        params = None
+        cols = ", ".join(_quote(c) for c in self.columns)
+        src = self._source(row_number=True)
+        if op["op"] == "dedupe":
+            sql = (f"SELECT {cols} FROM {src} QUALIFY row_number() OVER "
+                   f"(PARTITION BY {cols} ORDER BY file_row_number) = 1 ORDER BY file_row_number")
+        elif op["op"] == "clean":
+            sql, params = self._clean_plan_sql([p], src)
+        elif op["op"] == "clean_plan":
+            sql, params = self._clean_plan_sql(p["plan"], src)
+        elif op["op"] == "convert":
+            if p["new_type"] not in CAST_SQL:
+                raise ValueError(f"'{p['new_type']}' is not available for out-of-core data")
+            target = f"CAST({_quote(p['column'])} AS {CAST_SQL[p['new_type']]}) AS {_quote(p['column'])}"
+            select = ", ".join(target if c == p["column"] else _quote(c) for c in self.columns)
+            sql = f"SELECT {select} FROM {src} ORDER BY file_row_number"
+        elif op["op"] == "melt":
+            keep = ", ".join(_quote(c) for c in p["id_vars"] + p["value_vars"])
+            on = ", ".join(_quote(c) for c in p["value_vars"])
+            name, value = _quote(p["var_name"]), _quote(p["value_name"])
+            # pandas order: all rows for the first variable, then the next
+            sql = (f"SELECT * EXCLUDE (file_row_number) FROM (SELECT {keep}, file_row_number FROM {src}) "
+                   f"UNPIVOT INCLUDE NULLS ({value} FOR {name} IN ({on})) "
+                   f"ORDER BY list_position(?, {name}), file_row_number")
+            params = [[str(v) for v in p["value_vars"]]]
+        elif op["op"] == "pivot":
+            present = f"{_quote(p['index'])} IS NOT NULL AND {_quote(p['columns'])} IS NOT NULL"
+            sql = (f"SELECT * FROM (PIVOT (SELECT * FROM {self._source()} WHERE {present}) ON {_quote(p['columns'])} "
+                   f"USING {AGG_SQL[p['aggfunc']]}({_quote(p['values'])}) GROUP BY {_quote(p['index'])}) "
+                   f"ORDER BY {_quote(p['index'])}")
+        elif op["op"] == "compact":
+            # Parquet already stores every column in its narrowest physical type
+            return self
+        else:
+            raise ValueError(f"Operation '{op['op']}' is not available for out-of-core data")
+        return OutOfCoreFrame.from_query(sql, params)
+
+    def _fill_sql(self, step, params):
+        """SQL expression for one fill step over the `kept` rows, or None to leave the column as is."""
+        col, strategy = _quote(step["column"]), step["strategy"]
+        numeric = pd.api.types.is_numeric_dtype(self.dtypes[step["column"]])
+        if strategy == "Forward Fill":
+            return (f"last_value({col} IGNORE NULLS) OVER (ORDER BY file_row_number "
+                    f"ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)")
+        if strategy == "Backward Fill":
+            return (f"first_value({col} IGNORE NULLS) OVER (ORDER BY file_row_number "
+                    f"ROWS BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING)")
+        if strategy in ("Fill with Mean", "Fill with Median"):
+            agg = "AVG" if strategy == "Fill with Mean" else "MEDIAN"
+            return f"COALESCE(CAST({col} AS DOUBLE), (SELECT {agg}({col}) FROM kept))" if numeric else None
+        if strategy == "Fill with Mode":
+            return f"COALESCE({col}, (SELECT MODE({col}) FROM kept))"
+        if strategy == "Fill with Constant":
+            params.append(float(step["value"]) if numeric else str(step["value"]))
+            return f"COALESCE({col}, ?)"
+        if strategy == "Group-wise Fill":
+            # Rows without a group key stay null, as with pandas groupby
+            by = _quote(step["by"])
+            if numeric:
+                return (f"COALESCE(CAST({col} AS DOUBLE), CASE WHEN {by} IS NOT NULL "
+                        f"THEN AVG({col}) OVER (PARTITION BY {by}) END)")
+            return f"COALESCE({col}, CASE WHEN {by} IS NOT NULL THEN MODE({col}) OVER (PARTITION BY {by}) END)"
+        raise ValueError(f"Unknown cleaning strategy '{strategy}'")
+
+    def _clean_plan_sql(self, plan, src):
+        """One query for a whole cleaning plan: drop rows once, then fill from the kept rows."""
+        drop = [_quote(s["column"]) for s in plan if s["strategy"] == "Delete Row"]
+        where = " AND ".join(f"{c} IS NOT NULL" for c in drop) or "TRUE"
+        steps = {s["column"]: s for s in plan if s["strategy"] != "Delete Row"}
+        params, select = [], []
+        for c in self.columns:
+            expr = self._fill_sql(steps[c], params) if c in steps else None
+            select.append(f"{expr} AS {_quote(c)}" if expr else _quote(c))
+        sql = (f"WITH kept AS (SELECT * FROM {src} WHERE {where}) "
+               f"SELECT {', '.join(select)} FROM kept ORDER BY file_row_number")
+        return sql, params
+
+    # --- Export ---
+    def write_to(self, path, fmt):
+        """Streams the table into the file at `path` in `fmt`."""
+        options = {"CSV": "FORMAT CSV, HEADER", "CSV (gzip)": "FORMAT CSV, HEADER, COMPRESSION GZIP",
+                   "Parquet": "FORMAT PARQUET, COMPRESSION ZSTD"}
+        if fmt == "Feather":
+            import pyarrow.ipc as ipc
+            import pyarrow.parquet as pq
+            source = pq.ParquetFile(self.path)
+            with ipc.new_file(path, source.schema_arrow,
+                              options=ipc.IpcWriteOptions(compression="zstd")) as writer:
+                for batch in source.iter_batches():
+                    writer.write_batch(batch)
+        elif fmt in options:
+            _connection().execute(f"COPY (SELECT * FROM {self._source()}) TO {_literal(path)} ({options[fmt]})")
+        else:
+            raise ValueError(f"Unsupported export format '{fmt}'")
+
+    def export(self, fmt):
+        """Writes the table to a spill file in `fmt` and returns its bytes."""
+        path = os.path.join(_workspace(), f"{uuid.uuid4().hex}.out")
+        self.write_to(path, fmt)
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+def spill_upload(uploaded_file):
+    """Streams an uploaded CSV to disk and converts it to Parquet without building a DataFrame."""
+    path = os.path.join(_workspace(), f"{uuid.uuid4().hex}.csv")
+    uploaded_file.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(uploaded_file, out, 8 * 1024 * 1024)
+    uploaded_file.seek(0)
+    try:
+        return OutOfCoreFrame.from_csv(path)
+    finally:
+        os.remove(path)
+
+def spill_uploads(uploaded_files, source_column=None):
+    """Several uploaded CSVs as one out-of-core table, columns matched by name.
+
+    With `source_column`, a column records which upload each row came from.
+    """
+    paths = []
+    try:
+        for uploaded_file in uploaded_files:
+            paths.append(os.path.join(_workspace(), f"{uuid.uuid4().hex}.csv"))
+            uploaded_file.seek(0)
+            with open(paths[-1], "wb") as out:
+                shutil.copyfileobj(uploaded_file, out, 8 * 1024 * 1024)
+            uploaded_file.seek(0)
+        def select(uploaded_file, path):
+            label = f", {_literal(uploaded_file.name)} AS {_quote(source_column)}" if source_column else ""
+            return f"SELECT *{label} FROM read_csv_auto({_literal(path)})"
+        return OutOfCoreFrame.from_query(" UNION ALL BY NAME ".join(
+            select(f, p) for f, p in zip(uploaded_files, paths)))
+    finally:
+        for path in paths:
+            os.remove(path)
+
+def server_files():
+    """CSV/Parquet files available in DATA_DIR, if one is configured."""
+    if not DATA_DIR or not os.path.isdir(DATA_DIR):
+        return []
+    return sorted(f for f in os.listdir(DATA_DIR) if f.endswith((".csv", ".parquet")))
+
+def sample_frame(df, rows=SAMPLE_ROWS):
+    """pandas frame for steps that need every row in memory: the frame itself, or a sample."""
+    return df.sample(rows) if is_out_of_core(df) else df
@@ -0,0 +1,168 @@
+"""Headless batch runner: replays a pipeline spec over every file in a directory.
+
+    python data_batch.py spec.json data/ --output-dir out/ --format Parquet --workers 4
+
+The spec is a pipeline log exported from the app ({"format": 1, "steps": [...]}),
+optionally with "pattern" and "output_format" defaults for the command line.
+Files are processed in parallel, one per worker process: CSVs are streamed in
+chunks (or, past ANALYTICA_OUT_OF_CORE_BYTES with duckdb installed, converted
+to Parquet and processed out of core) and outputs are written chunk by chunk.
+Per-step timings for every file go to timings.csv in the output directory.
+"""
+import argparse
+import csv
+import fnmatch
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from data_backend import OutOfCoreFrame, should_spill
+from data_export import EXPORT_FORMATS, export_file
+from data_loader import read_csv_chunked
+from data_pipeline import describe, parse_log, run_operation
+
+BATCH_WORKERS = min(4, os.cpu_count() or 1)
+INPUT_PATTERN = "*.csv"
+TIMING_FIELDS = ["file", "step", "operation", "seconds", "rows", "columns", "error"]
+
+def load_spec(path):
+    """Steps and command-line defaults from a spec file."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    spec = json.loads(text)
+    return parse_log(text), {k: spec[k] for k in ("pattern", "output_format") if k in spec}
+
+def read_input(path):
+    """Opens one input file, out of core when it is too large for pandas."""
+    lower = path.lower()
+    if lower.endswith((".csv", ".parquet")) and should_spill(os.path.getsize(path)):
+        return OutOfCoreFrame.from_file(path)
+    if lower.endswith(".csv"):
+        with open(path, "rb") as f:
+            return read_csv_chunked(f)[0]
+    if lower.endswith(".parquet"):
+        return pd.read_parquet(path)
+    if lower.endswith(".feather"):
+        return pd.read_feather(path)
+    if lower.endswith((".xlsx", ".xls")):
+        return pd.read_excel(path)
+    raise ValueError(f"Unsupported input file '{os.path.basename(path)}'")
+
+def output_path(path, output_dir, fmt):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(output_dir, f"{stem}.{EXPORT_FORMATS[fmt]['ext']}")
+
+def check_outputs(inputs, output_dir, fmt):
+    """Raises ValueError when two inputs would write the same output file."""
+    seen = {}
+    for path in inputs:
+        out = output_path(path, output_dir, fmt)
+        if out in seen:
+            raise ValueError(f"'{os.path.basename(seen[out])}' and '{os.path.basename(path)}' "
+                             f"would both write {out}")
+        seen[out] = path
+
+def process_file(path, steps, output_dir, fmt):
+    """Reads, transforms and writes one file; returns its timing records.
+
+    A failing step is recorded (with its error) instead of raised, so one bad
+    file does not stop the rest of the batch.
+    """
+    def write(df):
+        export_file(df, fmt, output_path(path, output_dir, fmt))
+        return df
+
+    tasks = [("Read input", lambda _: read_input(path))]
+    tasks += [(describe(op), lambda df, op=op: run_operation(df, op)) for op in steps]
+    tasks.append((f"Write {fmt}", write))
+
+    records, df = [], None
+    for step, (operation, run) in enumerate(tasks):
+        record = {"file": path, "step": step, "operation": operation, "rows": None, "columns": None, "error": ""}
+        start = time.perf_counter()
+        try:
+            df = run(df)
+            record["rows"], record["columns"] = df.shape
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["seconds"] = time.perf_counter() - start
+        records.append(record)
+        if record["error"]:
+            break
+    return records
+
+def find_inputs(input_dir, pattern):
+    return sorted(os.path.join(input_dir, name) for name in os.listdir(input_dir)
+                  if fnmatch.fnmatch(name, pattern) and os.path.isfile(os.path.join(input_dir, name)))
+
+def run_batch(steps, inputs, output_dir, fmt="Parquet", workers=BATCH_WORKERS):
+    """Processes every input file, in parallel when workers > 1; returns all timing records."""
+    check_outputs(inputs, output_dir, fmt)
+    os.makedirs(output_dir, exist_ok=True)
+    if workers <= 1 or len(inputs) <= 1:
+        return [record for path in inputs for record in process_file(path, steps, output_dir, fmt)]
+    records = []
+    # spawn: each worker starts clean, with its own DuckDB connection and spill directory
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(inputs)), mp_context=context) as pool:
+        futures = [pool.submit(process_file, path, steps, output_dir, fmt) for path in inputs]
+        for future in as_completed(futures):
+            records.extend(future.result())
+    return sorted(records, key=lambda r: (r["file"], r["step"]))
+
+def write_timings(records, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=TIMING_FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+
+def summarize(records):
+    """Per-file totals, as printed at the end of a run."""
+    lines = []
+    for file in sorted({r["file"] for r in records}):
+        rows = [r for r in records if r["file"] == file]
+        last = rows[-1]
+        status = f"FAILED at step {last['step']} ({last['error']})" if last["error"] \
+            else f"{last['rows']:,} rows x {last['columns']:,} columns"
+        lines.append(f"{os.path.basename(file):<30}{sum(r['seconds'] for r in rows):>10.3f}s  {status}")
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("spec", help="pipeline log exported from the app (JSON)")
+    parser.add_argument("input_dir", help="directory holding the input files")
+    parser.add_argument("--output-dir", default="batch_output", help="where outputs and timings.csv go")
+    parser.add_argument("--pattern", help=f"file name pattern to process (default {INPUT_PATTERN})")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), help="output format (default Parquet)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="files processed in parallel")
+    args = parser.parse_args(argv)
+
+    steps, defaults = load_spec(args.spec)
+    pattern = args.pattern or defaults.get("pattern", INPUT_PATTERN)
+    fmt = args.format or defaults.get("output_format", "Parquet")
+    if fmt not in EXPORT_FORMATS:
+        parser.error(f"unsupported output format '{fmt}'")
+    inputs = find_inputs(args.input_dir, pattern)
+    if not inputs:
+        parser.error(f"no files matching '{pattern}' in {args.input_dir}")
+    try:
+        check_outputs(inputs, args.output_dir, fmt)
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    records = run_batch(steps, inputs, args.output_dir, fmt, args.workers)
+    write_timings(records, os.path.join(args.output_dir, "timings.csv"))
+    print("\n".join(summarize(records)))
+    failed = len({r["file"] for r in records if r["error"]})
+    print(f"\n{len(inputs) - failed}/{len(inputs)} files in {time.perf_counter() - start:.3f}s; "
+          f"timings in {os.path.join(args.output_dir, 'timings.csv')}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
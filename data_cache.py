@@ -0,0 +1,75 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+def approx_size(value):
+    """Rough in-memory footprint of a cached value, in bytes."""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(index=True, deep=False)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, (tuple, list)):
+        return sum(approx_size(v) for v in value)
+    return sys.getsizeof(value)
+
+class LRUCache:
+    """Thread-safe LRU mapping bounded by entry count and, optionally, total size."""
+
+    def __init__(self, max_entries=32, max_bytes=None, sizeof=approx_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def keys(self):
+        """Snapshot of the cached keys, oldest first."""
+        with self._lock:
+            return list(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key][0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self.nbytes -= self._data.pop(key)[1]
+            self._data[key] = (value, size)
+            self.nbytes += size
+            # Always keep the newest entry, even if it alone exceeds the budget
+            while len(self._data) > 1 and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes is not None and self.nbytes > self.max_bytes)
+            ):
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.nbytes -= evicted
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            value, size = self._data.pop(key)
+            self.nbytes -= size
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
@@ -1,20 +1,48 @@
 import streamlit as st
 import pandas as pd
 
-def apply_cleaning(df, column, strategy):
-    """Executes strategies for null handling."""
-    if strategy == "Delete Row":
-        # Drop rows where the specific column has NaN values
-        df = df.dropna(subset=[column]).reset_index(drop=True)
-    
-    elif strategy == "Forward Fill":
-        df[column] = df[column].ffill()
-        
-    elif strategy == "Backward Fill":
-        df[column] = df[column].bfill()
-        
-    elif strategy == "Fill with Mean":
-        if pd.api.types.is_numeric_dtype(df[column]):
-            df[column] = df[column].fillna(df[column].mean())
-            
-    return df
\ No newline at end of file
+from data_metrics import duplicate_count
+from data_operations import STRATEGIES, default_plan
+
+def cleaning_plan_editor(df, null_cols):
+    """Batch cleaning UI; returns a 'clean_plan' operation when one is applied."""
+    st.subheader("📋 Batch Cleaning Plan")
+    if st.button("✨ Clean All with Defaults", help="Median for numbers, forward fill for dates, mode for text."):
+        return {"op": "clean_plan", "params": {"plan": default_plan(df, null_cols)}}
+
+    defaults = {step["column"]: step["strategy"] for step in default_plan(df, null_cols)}
+    table = pd.DataFrame({"Column": [str(c) for c in null_cols],
+                          "Strategy": [defaults[c] for c in null_cols],
+                          "Constant": [""] * len(null_cols),
+                          "Group By": [None] * len(null_cols)})
+    edited = st.data_editor(table, hide_index=True, use_container_width=True, key="clean_plan_editor",
+                            column_config={
+                                "Column": st.column_config.TextColumn(disabled=True),
+                                "Strategy": st.column_config.SelectboxColumn(options=STRATEGIES + ["Skip"], required=True),
+                                "Constant": st.column_config.TextColumn(help="Used by 'Fill with Constant'"),
+                                "Group By": st.column_config.SelectboxColumn(options=[str(c) for c in df.columns],
+                                                                             help="Used by 'Group-wise Fill'"),
+                            })
+    if st.button("🧹 Apply Plan", type="primary"):
+        names = {str(c): c for c in null_cols}
+        columns = {str(c): c for c in df.columns}
+        plan = []
+        for row in edited.to_dict("records"):
+            if row["Strategy"] == "Skip":
+                continue
+            step = {"column": names[row["Column"]], "strategy": row["Strategy"]}
+            if row["Strategy"] == "Fill with Constant":
+                step["value"] = row["Constant"]
+            if row["Strategy"] == "Group-wise Fill":
+                if not row["Group By"]:
+                    st.warning(f"Pick a 'Group By' column for '{row['Column']}'.")
+                    return None
+                step["by"] = columns[row["Group By"]]
+            plan.append(step)
+        if plan:
+            return {"op": "clean_plan", "params": {"plan": plan}}
+    return None
+
+def count_duplicates(df, fingerprint):
+    """Number of fully duplicated rows, from the incrementally maintained row hashes."""
+    return duplicate_count(df, fingerprint)
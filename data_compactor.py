@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+COMPACT_ON_LOAD = True
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_RATIO = 0.5
+# Narrow targets offered by the conversion step next to the wide defaults
+COMPACT_TYPES = ["category", "string[pyarrow]", "Int64", "Int32", "Int16", "Int8", "float32", "auto"]
+
+def _smallest_int(low, high, nullable):
+    for bits in (8, 16, 32, 64):
+        info = np.iinfo(f"int{bits}")
+        if info.min <= low and high <= info.max:
+            return f"Int{bits}" if nullable else f"int{bits}"
+    return None
+
+def compact_dtype(series, category_ratio=CATEGORY_RATIO):
+    """Narrowest dtype that holds `series` without losing information, or None to keep it."""
+    if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+        return None
+    values = series.dropna()
+    if pd.api.types.is_integer_dtype(series):
+        if values.empty:
+            return None
+        nullable = pd.api.types.is_extension_array_dtype(series)
+        target = _smallest_int(values.min(), values.max(), nullable)
+    elif pd.api.types.is_float_dtype(series):
+        if values.empty:
+            return None
+        whole = np.isfinite(values).all() and (values == np.floor(values)).all()
+        if whole and len(values) < len(series):
+            # Integers that only became floats because of missing values
+            target = _smallest_int(values.min(), values.max(), nullable=True)
+        elif (values.astype("float32").astype(values.dtype) == values).all():
+            target = "float32"
+        else:
+            return None
+    elif series.dtype == object:
+        if pd.api.types.infer_dtype(values, skipna=False) != "string":
+            return None
+        target = "category" if values.nunique() <= category_ratio * len(series) else "string[pyarrow]"
+    else:
+        return None
+    return None if target is None or target == str(series.dtype) else target
+
+def compact_series(series, category_ratio=CATEGORY_RATIO):
+    target = compact_dtype(series, category_ratio)
+    return series.astype(target) if target else series
+
+def compaction_plan(df, category_ratio=CATEGORY_RATIO):
+    """{column: target dtype} for every column that can be narrowed."""
+    plan = {}
+    for col in df.columns:
+        target = compact_dtype(df[col], category_ratio)
+        if target:
+            plan[col] = target
+    return plan
+
+def compact_frame(df, category_ratio=CATEGORY_RATIO):
+    """Returns df with every column in its narrowest lossless dtype."""
+    plan = compaction_plan(df, category_ratio)
+    if not plan:
+        return df
+    out = df.copy(deep=False)
+    for col, target in plan.items():
+        out[col] = df[col].astype(target)
+    return out
+
+def _dtype_label(dtype):
+    return f"string[{dtype.storage}]" if isinstance(dtype, pd.StringDtype) else str(dtype)
+
+def memory_report(before, after):
+    """Per-column dtype and deep memory footprint, before and after compaction."""
+    report = pd.DataFrame({
+        "Before": before.dtypes.map(_dtype_label),
+        "After": after.dtypes.map(_dtype_label),
+        "Before (MB)": before.memory_usage(deep=True, index=False) / 1e6,
+        "After (MB)": after.memory_usage(deep=True, index=False) / 1e6,
+    })
+    report.index.name = "Column"
+    return report
+
+def show_memory_report(report, title="🗜️ Memory"):
+    before, after = report["Before (MB)"].sum(), report["After (MB)"].sum()
+    saved = 1 - after / before if before else 0.0
+    with st.expander(f"{title}: {before:,.2f} MB → {after:,.2f} MB ({saved:.0%} saved)"):
+        st.dataframe(report.style.format({"Before (MB)": "{:,.2f}", "After (MB)": "{:,.2f}"}),
+                     use_container_width=True)
+
+@st.cache_data(max_entries=4, show_spinner="Measuring memory...")
+def compaction_preview(_df, version):
+    """Memory report of compacting the frame at `version`, computed once per version."""
+    return memory_report(_df, compact_frame(_df))
@@ -0,0 +1,112 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations_with_replacement
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_diagnostics import timed
+
+COMPUTE_WORKERS = min(8, os.cpu_count() or 1)
+# Columns per correlation block: each block pair is one set of float32 GEMMs
+CORR_BLOCK = 128
+CORR_METHODS = ["pearson", "spearman"]
+NULL_MODES = ["pairwise", "complete"]
+
+@st.cache_resource(show_spinner=False)
+def compute_executor():
+    """Shared worker pool; numpy and BLAS release the GIL, so threads run in parallel."""
+    return ThreadPoolExecutor(max_workers=COMPUTE_WORKERS, thread_name_prefix="analytica-compute")
+
+def parallel_map(func, items):
+    items = list(items)
+    if len(items) < 2:
+        return list(map(func, items))
+    return list(compute_executor().map(func, items))
+
+@timed("Describe columns")
+def describe_columns(df, include=None):
+    """Same table as df.describe(include), with one task per column."""
+    if include is None:
+        selected = df.select_dtypes(include=["number"])
+        selected = selected if selected.shape[1] else df
+    else:
+        selected = df.select_dtypes(include=include)
+    if selected.shape[1] == 0:
+        return df.describe(include=include)
+    summaries = parallel_map(lambda col: selected[col].describe(), selected.columns)
+    return pd.concat(summaries, axis=1, keys=selected.columns)
+
+def _standardize(values):
+    """Float32 z-scores per column over present values (nulls stay NaN), and which columns vary."""
+    present = (~np.isnan(values)).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nansum(values, axis=0) / present
+        std = np.sqrt(np.nansum((values - mean) ** 2, axis=0) / present)
+    defined = np.isfinite(std) & (std > 0)
+    return ((values - mean) / np.where(defined, std, 1.0)).astype("float32"), defined
+
+def _block_complete(z, i, j):
+    return z[:, i].T @ z[:, j]
+
+def _block_pairwise(z, mask, i, j):
+    """Pearson over rows where both columns are present, from masked moments."""
+    xi, xj = z[:, i], z[:, j]
+    mi, mj = mask[:, i], mask[:, j]
+    n = mi.T @ mj
+    si, sj = xi.T @ mj, mi.T @ xj
+    sii, sjj = (xi * xi).T @ mj, mi.T @ (xj * xj)
+    cov = n * (xi.T @ xj) - si * sj
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return cov / np.sqrt((n * sii - si * si) * (n * sjj - sj * sj))
+
+@timed("Correlation matrix")
+def correlation(df, method="pearson", nulls="pairwise", block=CORR_BLOCK):
+    """Correlation matrix of the numeric columns of df.
+
+    Columns are standardized to float32 once; the matrix is then assembled
+    from column blocks, each a few BLAS products run on the shared pool.
+    `nulls="pairwise"` uses every row where both columns are present (like
+    DataFrame.corr); `"complete"` first drops rows with any null. Spearman
+    ranks each column over its present values, so with pairwise nulls it can
+    differ slightly from pandas, which re-ranks every pair.
+    """
+    if method not in CORR_METHODS:
+        raise ValueError(f"Unsupported correlation method '{method}'")
+    numeric = df.select_dtypes(include=["number"])
+    if nulls == "complete":
+        # All-null columns would drop every row; they correlate with nothing anyway
+        numeric = numeric.dropna(subset=numeric.columns[numeric.notna().any()])
+    columns = numeric.columns
+    if method == "spearman":
+        ranks = parallel_map(lambda col: numeric[col].rank().to_numpy(dtype="float64", na_value=np.nan), columns)
+        values = np.column_stack(ranks) if ranks else np.empty((len(numeric), 0))
+    else:
+        values = numeric.to_numpy(dtype="float64", na_value=np.nan)
+
+    z, defined = _standardize(values)
+    mask = ~np.isnan(z)
+    complete = nulls == "complete" or mask.all()
+    if complete:
+        z = np.nan_to_num(z)
+    else:
+        mask = mask.astype("float32")
+        z = np.where(mask, z, 0).astype("float32")
+
+    blocks = [slice(s, s + block) for s in range(0, len(columns), block)]
+    pairs = list(combinations_with_replacement(range(len(blocks)), 2))
+    def run(pair):
+        i, j = blocks[pair[0]], blocks[pair[1]]
+        return _block_complete(z, i, j) / max(len(z), 1) if complete else _block_pairwise(z, mask, i, j)
+    corr = np.full((len(columns), len(columns)), np.nan)
+    for (a, b), part in zip(pairs, parallel_map(run, pairs)):
+        corr[blocks[a], blocks[b]] = part
+        corr[blocks[b], blocks[a]] = part.T
+
+    # Constant (or all-null) columns have no defined correlation
+    corr[~defined, :] = np.nan
+    corr[:, ~defined] = np.nan
+    corr = np.clip(corr, -1, 1)
+    np.fill_diagonal(corr, np.where(defined, 1.0, np.nan))
+    return pd.DataFrame(corr, index=columns, columns=columns)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# Above this many rows, point charts are drawn from server-side aggregates
+RASTER_THRESHOLD = 50_000
+RASTER_SHAPE = (480, 320)   # density grid cells (x, y): roughly the plot's pixel size
+LINE_BINS = 500
+VOXEL_BINS = 40
+BUBBLE_BINS = 60
+OVERLAY_POINTS = 2_000
+
+def needs_aggregation(df, enabled=True):
+    return enabled and len(df) > RASTER_THRESHOLD
+
+def sample_rows(df, k=OVERLAY_POINTS, seed=0):
+    """Uniform sample without replacement (reservoir-equivalent for an in-memory frame)."""
+    if len(df) <= k:
+        return df
+    idx = np.random.default_rng(seed).choice(len(df), size=k, replace=False)
+    return df.iloc[np.sort(idx)]
+
+def _numeric_pair(df, x, y):
+    xy = df[[x, y]].apply(pd.to_numeric, errors="coerce").dropna()
+    return xy[x].to_numpy(dtype="float64"), xy[y].to_numpy(dtype="float64")
+
+def density_grid(df, x, y, shape=RASTER_SHAPE):
+    """2D count raster of (x, y): cost is one pass over rows, output is fixed size."""
+    xs, ys = _numeric_pair(df, x, y)
+    counts, x_edges, y_edges = np.histogram2d(xs, ys, bins=shape)
+    return counts.T, (x_edges[0], x_edges[-1], y_edges[0], y_edges[-1])
+
+def draw_density(ax, df, x, y, cmap="viridis"):
+    """Renders a log-scaled density raster onto a matplotlib axis; returns the image."""
+    counts, extent = density_grid(df, x, y)
+    image = ax.imshow(np.log1p(counts), extent=extent, origin="lower", aspect="auto",
+                      cmap=cmap, interpolation="nearest")
+    image.set_alpha((counts > 0).astype(float))
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    return image
+
+def binned_line(df, x, y, hue=None, bins=LINE_BINS):
+    """Mean/min/max of y per x bin (and hue), for line charts over many rows."""
+    cols = [x, y] + ([hue] if hue else [])
+    data = df[cols].dropna()
+    data = data.assign(_bin=pd.cut(pd.to_numeric(data[x]), bins=bins, labels=False))
+    keys = [hue, "_bin"] if hue else ["_bin"]
+    agg = data.groupby(keys, observed=True).agg(x=(x, "mean"), mean=(y, "mean"),
+                                                low=(y, "min"), high=(y, "max"))
+    return agg.reset_index()
+
+def aggregate_points(df, dims, bins, hue=None, measures=()):
+    """Collapses points into a regular grid over `dims`.
+
+    Each non-empty cell (per hue value) becomes one point at the cell's
+    centroid, carrying the row count and the mean of each measure.
+    """
+    cols = list(dict.fromkeys(list(dims) + list(measures) + ([hue] if hue else [])))
+    data = df[cols].dropna()
+    codes = {f"_b{i}": pd.cut(data[d], bins=bins, labels=False) for i, d in enumerate(dims)}
+    data = data.assign(**codes)
+    keys = list(codes) + ([hue] if hue else [])
+    spec = {d: (d, "mean") for d in dict.fromkeys(list(dims) + list(measures))}
+    spec["count"] = (dims[0], "size")
+    return data.groupby(keys, observed=True).agg(**spec).reset_index(drop=not hue).drop(
+        columns=list(codes), errors="ignore")
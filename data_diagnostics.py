@@ -0,0 +1,197 @@
+import contextvars
+import functools
+import importlib.util
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+import streamlit as st
+import pandas as pd
+
+# Measurements kept per session for the diagnostics panel (oldest dropped first)
+DIAGNOSTICS_LIMIT = 2_000
+# Append every measurement of every session to this file as JSON lines (unset = off)
+PERF_LOG = os.environ.get("ANALYTICA_PERF_LOG")
+PROFILE_ROWS = 30
+# pyinstrument is an optional extra: when installed it can replace cProfile for a run
+PYINSTRUMENT_AVAILABLE = importlib.util.find_spec("pyinstrument") is not None
+PROFILERS = ["cProfile"] + (["pyinstrument"] if PYINSTRUMENT_AVAILABLE else [])
+
+_recorder = contextvars.ContextVar("analytica_recorder", default=None)
+_log_lock = threading.Lock()
+
+def rss_bytes():
+    """Resident memory of this process, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class Recorder:
+    """One session's measurements, plus its pending and last profiler run."""
+
+    def __init__(self, limit=DIAGNOSTICS_LIMIT):
+        self.session = uuid.uuid4().hex[:8]
+        self.events = deque(maxlen=limit)
+        self.run = 0
+        self.depth = 0
+        self.profile_next = None
+        self.profile = None
+
+    def clear(self):
+        self.events.clear()
+        self.profile = None
+
+    def frame(self):
+        return pd.DataFrame(list(self.events), columns=["run", "depth", "kind", "name", "seconds", "memory_mb"])
+
+    def to_jsonl(self):
+        return "".join(json.dumps(event) + "\n" for event in self.events)
+
+def _write_log(event):
+    with _log_lock, open(PERF_LOG, "a", encoding="utf-8") as f:
+        f.write(json.dumps(event) + "\n")
+
+def record(name, seconds, kind="call", memory_mb=None, depth=0):
+    """Adds one measurement taken elsewhere (e.g. a finished background job)."""
+    recorder = _recorder.get()
+    event = {"time": time.time(), "session": recorder.session if recorder else None,
+             "run": recorder.run if recorder else None, "depth": depth, "kind": kind, "name": name,
+             "seconds": round(seconds, 6), "memory_mb": memory_mb}
+    if recorder is not None:
+        recorder.events.append(event)
+    if PERF_LOG:
+        _write_log(event)
+
+@contextmanager
+def measure(name, kind="call"):
+    """Records the wall time and resident-memory change of the block.
+
+    Measurements land in the session bound by session_trace(); elsewhere
+    (background jobs, the batch runner) they only go to ANALYTICA_PERF_LOG.
+    Memory is the whole process's RSS, so concurrent sessions blur it.
+    """
+    recorder = _recorder.get()
+    if recorder is None and not PERF_LOG:
+        yield
+        return
+    depth = recorder.depth if recorder is not None else 0
+    if recorder is not None:
+        recorder.depth += 1
+    before, start = rss_bytes(), time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds, after = time.perf_counter() - start, rss_bytes()
+        if recorder is not None:
+            recorder.depth = depth
+        record(name, seconds, kind, depth=depth,
+               memory_mb=None if before is None or after is None else round((after - before) / 1024 ** 2, 3))
+
+def timed(name, kind="call"):
+    """Decorator form of measure()."""
+    def wrap(func):
+        @functools.wraps(func)
+        def timed_call(*args, **kwargs):
+            with measure(name, kind):
+                return func(*args, **kwargs)
+        return timed_call
+    return wrap
+
+def _start_profiler(engine):
+    if engine == "pyinstrument":
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+        return profiler
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+def _stop_profiler(engine, profiler, run):
+    """{"engine", "run", "data" (file bytes), "ext", "summary" (text)} for a finished profile."""
+    if engine == "pyinstrument":
+        profiler.stop()
+        return {"engine": engine, "run": run, "data": profiler.output_html().encode(), "ext": "html",
+                "summary": profiler.output_text(unicode=True)}
+    import marshal
+    import pstats
+    profiler.disable()
+    profiler.create_stats()
+    text = io.StringIO()
+    stats = pstats.Stats(profiler, stream=text)
+    # Same bytes as Stats.dump_stats(): readable by pstats, snakeviz, etc.
+    data = marshal.dumps(stats.stats)
+    stats.sort_stats("cumulative").print_stats(PROFILE_ROWS)
+    return {"engine": engine, "run": run, "data": data, "ext": "prof", "summary": text.getvalue()}
+
+@contextmanager
+def session_trace():
+    """Wraps one script run: binds this session's recorder and runs a requested profile."""
+    recorder = st.session_state.setdefault("diagnostics", Recorder())
+    recorder.run += 1
+    recorder.depth = 0
+    token = _recorder.set(recorder)
+    engine, recorder.profile_next = recorder.profile_next, None
+    profiler = _start_profiler(engine) if engine else None
+    try:
+        with measure("Script run", kind="run"):
+            yield recorder
+    finally:
+        if profiler is not None:
+            recorder.profile = _stop_profiler(engine, profiler, recorder.run)
+        _recorder.reset(token)
+
+def diagnostics_panel():
+    """Sidebar view of this session's timings, with log and profile downloads."""
+    recorder = _recorder.get()
+    if recorder is None:
+        return
+    with st.expander("🩺 Diagnostics"):
+        events = recorder.frame()
+        runs = events[events["kind"] == "run"]
+        if len(runs):
+            last = runs.iloc[-1]
+            memory = "" if pd.isna(last["memory_mb"]) else f", {last['memory_mb']:+,.1f} MB"
+            st.caption(f"Previous run: {last['seconds']:.3f}s{memory} · {len(runs):,} runs recorded")
+
+        # This run so far (the step that just rendered) and the previous full run
+        recent = events[events["run"] >= recorder.run - 1].copy()
+        recent["name"] = ["  " * d + n for d, n in zip(recent["depth"], recent["name"])]
+        st.dataframe(recent[["run", "name", "seconds", "memory_mb"]].iloc[::-1], hide_index=True,
+                     use_container_width=True)
+
+        if len(events):
+            st.markdown("**Slowest calls (all runs)**")
+            summary = events[events["kind"] != "run"].groupby("name")["seconds"].agg(["count", "mean", "max", "sum"])
+            st.dataframe(summary.sort_values("sum", ascending=False).head(10), use_container_width=True)
+
+        st.download_button("📥 Timings (JSON lines)", recorder.to_jsonl(),
+                           file_name=f"analytica_timings_{recorder.session}.jsonl",
+                           mime="application/x-ndjson", use_container_width=True)
+
+        engine = st.selectbox("Profiler:", PROFILERS, key="diagnostics_profiler")
+        c1, c2 = st.columns(2)
+        if c1.button("🧪 Profile Next Run", use_container_width=True):
+            # The run triggered by the user's next interaction is the one profiled
+            recorder.profile_next = engine
+        if recorder.profile_next:
+            st.info(f"Your next action will be profiled with {recorder.profile_next}.")
+        if c2.button("🧹 Clear", use_container_width=True):
+            recorder.clear()
+            st.rerun()
+
+        profile = recorder.profile
+        if profile is not None:
+            st.caption(f"{profile['engine']} profile of run {profile['run']}")
+            st.download_button(f"📥 Profile (.{profile['ext']})", profile["data"],
+                               file_name=f"analytica_run{profile['run']}.{profile['ext']}",
+                               use_container_width=True)
+            st.code(profile["summary"], language=None)
@@ -1,86 +1,195 @@
+import importlib.util
+
 import streamlit as st
 import pandas as pd
-from ydata_profiling import ProfileReport
 import streamlit.components.v1 as components
 
+from data_aggregator import aggregation_cube
+from data_backend import is_out_of_core
+from data_cache import LRUCache
+from data_diagnostics import timed
+from data_grid import show_grid, show_query_grid
+from data_index import column_index, filter_positions
+from data_jobs import running_job, submit_job
+from data_profiler import profile_frame, render_html
+
+PROFILE_TIERS = ["⚡ Minimal (instant)", "🎯 Stratified Sample", "🔬 Full (background)"]
+PROFILE_ENGINES = ["⚙️ Built-in", "📚 ydata-profiling"]
+# ydata-profiling is an optional extra, imported only when a report is requested
+YDATA_AVAILABLE = importlib.util.find_spec("ydata_profiling") is not None
+DEFAULT_SAMPLE_ROWS = 10_000
+
 @st.cache_resource
-def get_profile_report(df):
+def profile_cache():
+    """Process-wide LRU of rendered reports, bounded by count and total HTML size."""
+    return LRUCache(max_entries=8, max_bytes=256 * 1024 * 1024)
+
+def stratified_sample(df, n, by=None, seed=0):
+    """Proportional sample of about n rows, keeping at least one row per stratum."""
+    if n >= len(df):
+        return df
+    if by is None:
+        return df.sample(n=n, random_state=seed)
+    groups = df.groupby(by, dropna=False, group_keys=False)
+    picked = pd.concat([groups.sample(frac=n / len(df), random_state=seed), groups.head(1)])
+    return picked[~picked.index.duplicated()]
+
+@timed("Build profile")
+def build_profile(df, minimal, progress=None, engine=PROFILE_ENGINES[0]):
+    """Renders a profile report; `progress(fraction, message)` reports coarse stages."""
+    if engine == PROFILE_ENGINES[0]:
+        return render_html(profile_frame(df, minimal=minimal, progress=progress))
+
+    from ydata_profiling import ProfileReport
+    report = progress or (lambda frac, msg: None)
+    report(0.05, "Configuring profile...")
     profile = ProfileReport(
         df, 
         title="Data Audit",
-        explorative=True,
-        minimal=False
+        explorative=not minimal,
+        minimal=minimal,
+        progress_bar=False
     )
     
     # --- THE CRITICAL FIX ---
     profile.config.html.navbar_show = False  # Removes the internal second sidebar/nav
     profile.config.html.full_width = True     # Ensures it fills the Streamlit container
     profile.config.html.style.theme = None   # Uses the standard Jupyter look
+
+    report(0.1, "Describing variables...")
+    profile.get_description()
+    report(0.8, "Rendering HTML...")
+    html = profile.to_html()
+    report(1.0, "Done")
+    return html
+
+def get_profile_report(df, version, tier, engine, sample_rows=DEFAULT_SAMPLE_ROWS, strata=None):
+    """Profiles computed synchronously and cached by version."""
+    key = (version, tier, engine, sample_rows, strata)
+    html = profile_cache().get(key)
+    if html is None:
+        data = stratified_sample(df, sample_rows, strata) if tier == PROFILE_TIERS[1] else df
+        html = profile_cache().put(key, build_profile(data, minimal=tier == PROFILE_TIERS[0], engine=engine))
+    return html
+
+def submit_profile(df, key, engine):
+    """Builds a sampled or full report as a background job; the HTML lands in profile_cache."""
+    tier, sample_rows, strata = key[1], key[3], key[4]
+    data = stratified_sample(df, sample_rows, strata) if tier == PROFILE_TIERS[1] else df
+    return submit_job("profile", build_profile, data, minimal=False, engine=engine, key=key,
+                      label="AI Report", progress=True, on_done=lambda html: profile_cache().put(key, html))
+
+def show_report(report_html):
+    # High-resolution Download (Best for external sharing)
+    st.download_button(
+        label="📂 Open Full-Screen Report",
+        data=report_html,
+        file_name="Clean_Data_Report.html",
+        mime="text/html",
+        use_container_width=True
+    )
+    
+    st.divider()
     
-    return profile.to_html()
+    # The "White Box" wrapper ensures black text is readable and 
+    # CSS doesn't bleed into your main Streamlit sidebar.
+    components.html(
+        f"""
+        <div style="background-color: white; border-radius: 10px; padding: 10px;">
+            {report_html}
+        </div>
+        """, 
+        height=1000, 
+        scrolling=True
+    )
 
-def run_automated_discovery(df):
+def run_automated_discovery(df, version):
     st.header("🔍 Automated AI Report")
     
     st.markdown("""
     *For a full-screen view without any layout constraints, use the button below.*
     """)
 
-    if st.button("🚀 Generate AI Report"):
+    c1, c2 = st.columns(2)
+    engine = c1.radio("Engine:", PROFILE_ENGINES if YDATA_AVAILABLE else PROFILE_ENGINES[:1],
+                      horizontal=True, key="profile_engine",
+                      help="The built-in engine is a fast vectorized profiler. "
+                           "Install ydata-profiling for the detailed report.")
+    tier = c2.radio("Profile depth:", PROFILE_TIERS, horizontal=True, key="profile_tier")
+    sample_rows, strata = None, None
+    if tier == PROFILE_TIERS[1]:
+        c1, c2 = st.columns(2)
+        sample_rows = int(c1.number_input("Sample size (rows):", min_value=100,
+                                          value=min(DEFAULT_SAMPLE_ROWS, max(len(df), 100)), step=1000))
+        cat_cols = df.select_dtypes(include=['object', 'category', 'string']).columns.tolist()
+        strata = c2.selectbox("Stratify by:", [None] + cat_cols, key="profile_strata")
+
+    key = (version, tier, engine, sample_rows, strata)
+
+    # --- SAMPLED / FULL: run as background jobs so the session stays responsive ---
+    if tier != PROFILE_TIERS[0]:
+        report_html = profile_cache().get(key)
+        if report_html is not None:
+            show_report(report_html)
+        elif running_job("profile", key) is not None:
+            st.info("⏳ The report is being generated in the background; progress is in the sidebar.")
+        else:
+            if st.button("🚀 Generate AI Report"):
+                submit_profile(df, key, engine)
+                st.rerun()
+            st.info("The report runs in the background; you can keep working meanwhile.")
+        return
+
+    # --- MINIMAL: fast enough to run inline ---
+    if key in profile_cache() or st.button("🚀 Generate AI Report"):
         with st.spinner("Analyzing dataset..."):
             try:
-                report_html = get_profile_report(df)
-                
-                # High-resolution Download (Best for external sharing)
-                st.download_button(
-                    label="📂 Open Full-Screen Report",
-                    data=report_html,
-                    file_name="Clean_Data_Report.html",
-                    mime="text/html",
-                    use_container_width=True
-                )
-                
-                st.divider()
-                
-                # The "White Box" wrapper ensures black text is readable and 
-                # CSS doesn't bleed into your main Streamlit sidebar.
-                components.html(
-                    f"""
-                    <div style="background-color: white; border-radius: 10px; padding: 10px;">
-                        {report_html}
-                    </div>
-                    """, 
-                    height=1000, 
-                    scrolling=True
-                )
-                
+                show_report(get_profile_report(df, version, tier, engine, sample_rows, strata))
             except Exception as e:
                 st.error(f"Error: {e}")
     else:
         st.info("Click to generate the report on your current cleaned data.")
 
-def filter_data(df):
-    """Manual row-level filtering logic."""
+def filter_data(df, fingerprint):
+    """Manual row-level filtering logic; conditions on several columns are combined with AND."""
     st.subheader("🎯 Dynamic Filtering")
-    col = st.selectbox("Select column to filter by:", df.columns, key="filter_box")
+    cols = st.multiselect("Select columns to filter by:", df.columns, default=list(df.columns[:1]), key="filter_cols")
     
-    if df[col].dtype == 'object' or df[col].dtype.name == 'category':
-        unique_vals = df[col].unique().tolist()
-        selected = st.multiselect(f"Select values from {col}:", unique_vals)
-        if selected:
-            df = df[df[col].isin(selected)]
-    elif pd.api.types.is_numeric_dtype(df[col]):
-        min_v, max_v = float(df[col].min()), float(df[col].max())
-        range_val = st.slider(f"Range for {col}:", min_v, max_v, (min_v, max_v))
-        df = df[(df[col] >= range_val[0]) & (df[col] <= range_val[1])]
+    # Column indexes are built once per column version, not on every slider move;
+    # out-of-core frames answer the same questions with DuckDB queries
+    out_of_core = is_out_of_core(df)
+    conditions = {}
+    for col in cols:
+        dtype = df.dtypes[col]
+        if dtype == 'object' or dtype.name in ('category', 'string'):
+            unique_vals = df.distinct(col) if out_of_core else column_index(df, fingerprint, col).values
+            selected = st.multiselect(f"Select values from {col}:", unique_vals, key=f"filter_in_{col}")
+            if selected:
+                conditions[col] = selected
+        elif pd.api.types.is_numeric_dtype(dtype):
+            bounds = df.bounds(col) if out_of_core else column_index(df, fingerprint, col).bounds()
+            if bounds is None:
+                continue
+            min_v, max_v = float(bounds[0]), float(bounds[1])
+            low, high = st.slider(f"Range for {col}:", min_v, max_v, (min_v, max_v), key=f"filter_range_{col}")
+            # The full range keeps every row, so only a narrowed range reaches the index
+            if (low, high) != (min_v, max_v):
+                conditions[col] = (low, high)
     
-    st.dataframe(df, use_container_width=True)
+    # Only the visible page is sent to the browser
+    if out_of_core:
+        show_query_grid(lambda offset, limit, sort, ascending: df.filter(conditions, limit, offset, sort, ascending),
+                        df.columns, df.match_count(conditions), key="filter_grid")
+        return None
+    if conditions:
+        df = df.iloc[filter_positions(df, fingerprint, conditions)]
+    show_grid(df, key="filter_grid", cache_key=(fingerprint.key, repr(conditions)))
     return df
 
-def group_data(df):
+def group_data(df, version):
     """Manual categorical aggregation logic."""
     st.subheader("🧮 Grouped Aggregation")
-    cat_cols = df.select_dtypes(include=['object', 'category']).columns
+    cat_cols = df.select_dtypes(include=['object', 'category', 'string']).columns
     num_cols = df.select_dtypes(include=['number']).columns
     
     if len(cat_cols) > 0 and len(num_cols) > 0:
@@ -89,8 +198,16 @@ def group_data(df):
         n_col = c2.selectbox("Measure:", num_cols)
         op = c3.selectbox("Function:", ["mean", "sum", "count", "min", "max"])
         
+        key = (version, g_col, n_col, op)
         if st.button("Run Aggregation"):
-            res = df.groupby(g_col)[n_col].agg(op).reset_index()
-            st.dataframe(res, use_container_width=True)
+            if is_out_of_core(df):
+                res = df.aggregate([g_col], [n_col], op)[n_col].reset_index()
+            else:
+                res = aggregation_cube().aggregate(df, version, [g_col], [n_col], op)[n_col].reset_index()
+            # Kept so paging and sorting (which rerun the script) do not lose the result
+            st.session_state.group_result = (key, res)
+        result = st.session_state.get("group_result")
+        if result is not None and result[0] == key:
+            show_grid(result[1], key="group_grid")
     else:
         st.warning("Ensure you have both categorical and numerical columns.")
\ No newline at end of file
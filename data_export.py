@@ -0,0 +1,101 @@
+import gzip
+import io
+
+import streamlit as st
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from data_backend import is_out_of_core
+from data_diagnostics import timed
+
+EXPORT_CHUNK_ROWS = 100_000
+
+EXPORT_FORMATS = {
+    "CSV": {"ext": "csv", "mime": "text/csv"},
+    "CSV (gzip)": {"ext": "csv.gz", "mime": "application/gzip"},
+    "Parquet": {"ext": "parquet", "mime": "application/vnd.apache.parquet"},
+    "Feather": {"ext": "feather", "mime": "application/vnd.apache.arrow.file"},
+}
+
+def _chunks(df, chunk_rows):
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield start, df.iloc[start:start + chunk_rows]
+
+def write_csv(df, sink, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Writes CSV chunk by chunk so the full text never exists as one string."""
+    text = io.TextIOWrapper(sink, encoding="utf-8", newline="", write_through=True)
+    for start, chunk in _chunks(df, chunk_rows):
+        chunk.to_csv(text, index=False, header=start == 0)
+    text.detach()
+
+def write_arrow(df, sink, fmt, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Writes Parquet row groups / Feather record batches chunk by chunk.
+
+    The schema comes from the whole frame, so a column that is all null in its
+    first chunk is still written with the type of its later values.
+    """
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    writer = None
+    try:
+        writer = pq.ParquetWriter(sink, schema, compression="zstd") if fmt == "Parquet" \
+            else ipc.new_file(sink, schema, options=ipc.IpcWriteOptions(compression="zstd"))
+        for _, chunk in _chunks(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    finally:
+        if writer is not None:
+            writer.close()
+
+def _write(df, sink, fmt, chunk_rows):
+    if fmt == "CSV":
+        write_csv(df, sink, chunk_rows)
+    elif fmt == "CSV (gzip)":
+        with gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=6) as gz:
+            write_csv(df, gz, chunk_rows)
+    elif fmt in ("Parquet", "Feather"):
+        write_arrow(df, sink, fmt, chunk_rows)
+    else:
+        raise ValueError(f"Unsupported export format '{fmt}'")
+
+@timed("Export")
+def export_frame(df, fmt, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Serializes df in the requested format and returns the bytes."""
+    if is_out_of_core(df):
+        return df.export(fmt)
+    sink = io.BytesIO()
+    _write(df, sink, fmt, chunk_rows)
+    return sink.getvalue()
+
+def export_file(df, fmt, path, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Writes df to the file at `path`, chunk by chunk, without building the bytes in memory."""
+    if is_out_of_core(df):
+        df.write_to(path, fmt)
+        return
+    with open(path, "wb") as sink:
+        _write(df, sink, fmt, chunk_rows)
+
+def export_panel(df, version):
+    """Sidebar export: files are built only on request and cached per dataset version."""
+    fmt = st.selectbox("Format:", list(EXPORT_FORMATS), key="export_fmt")
+    key = (version, fmt)
+    cached = st.session_state.get("export_cache")
+
+    if cached is None or cached["key"] != key:
+        if st.button("⚙️ Prepare Download", use_container_width=True):
+            with st.spinner(f"Writing {fmt}..."):
+                try:
+                    st.session_state.export_cache = cached = {"key": key, "data": export_frame(df, fmt)}
+                except Exception as e:
+                    st.error(f"Export failed: {e}")
+                    return
+        else:
+            return
+
+    spec = EXPORT_FORMATS[fmt]
+    st.download_button(
+        label=f"📥 Download {fmt} ({len(cached['data']) / 1e6:.1f} MB)",
+        data=cached["data"],
+        file_name=f"analytica_processed_data.{spec['ext']}",
+        mime=spec["mime"],
+        use_container_width=True
+    )
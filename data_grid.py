@@ -0,0 +1,72 @@
+import math
+
+import streamlit as st
+
+from data_cache import LRUCache
+
+PAGE_SIZES = [25, 50, 100, 500]
+
+@st.cache_resource(show_spinner=False)
+def sort_cache():
+    """Sorted row orders keyed by (caller's cache key, column, direction)."""
+    return LRUCache(max_entries=16, max_bytes=256 * 1024 ** 2, sizeof=lambda order: order.nbytes)
+
+def sort_order(series, ascending=True):
+    """Row positions of `series` in sorted order: nulls last, ties in row order (as sort_values).
+
+    Values that cannot be compared with each other (numbers and text in one
+    object column, as Excel imports often give) are sorted by their text.
+    """
+    series = series.reset_index(drop=True)
+    try:
+        ordered = series.sort_values(ascending=ascending, na_position="last", kind="stable")
+    except TypeError:
+        text = series.where(series.isna(), series.astype(str))
+        ordered = text.sort_values(ascending=ascending, na_position="last", kind="stable")
+    return ordered.index.to_numpy()
+
+def page_rows(df, start, stop, sort=None, ascending=True, cache_key=None):
+    """Rows start..stop of df, optionally in `sort` order; only these rows are materialized.
+
+    With a `cache_key` identifying df's contents, the sort order is kept, so
+    paging through a sorted table sorts once.
+    """
+    if sort is None:
+        return df.iloc[start:stop]
+    key = None if cache_key is None else (cache_key, sort, ascending)
+    order = sort_cache().get(key) if key is not None else None
+    if order is None:
+        order = sort_order(df[sort], ascending)
+        if key is not None:
+            sort_cache().put(key, order)
+    return df.iloc[order[start:stop]]
+
+def _controls(columns, total, key):
+    """Page size, sort and page widgets; returns (start, stop, sort, ascending)."""
+    c1, c2, c3, c4 = st.columns([1, 2, 1, 1])
+    size = c1.selectbox("Rows per page:", PAGE_SIZES, key=f"{key}_size")
+    sort = c2.selectbox("Sort by:", [None] + list(columns), key=f"{key}_sort",
+                        format_func=lambda c: "(original order)" if c is None else str(c))
+    ascending = c3.radio("Order:", ["↑", "↓"], horizontal=True, key=f"{key}_order") == "↑"
+    pages = max(math.ceil(total / size), 1)
+    # A narrower result (new filter, bigger pages) can leave the stored page out of range
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    page = c4.number_input(f"Page (of {pages:,}):", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    start = (int(page) - 1) * size
+    return start, min(start + size, total), sort, ascending
+
+def _caption(start, stop, total):
+    st.caption(f"Rows {start + 1 if total else 0:,}–{stop:,} of {total:,}")
+
+def show_grid(df, key, cache_key=None):
+    """Paginated, sortable view of df: only the visible page is serialized and sent to the browser."""
+    start, stop, sort, ascending = _controls(df.columns, len(df), key)
+    st.dataframe(page_rows(df, start, stop, sort, ascending, cache_key), use_container_width=True)
+    _caption(start, stop, len(df))
+
+def show_query_grid(fetch, columns, total, key):
+    """Same view over a source that pages itself: `fetch(offset, limit, sort, ascending)` returns the rows."""
+    start, stop, sort, ascending = _controls(columns, total, key)
+    st.dataframe(fetch(start, stop - start, sort, ascending), use_container_width=True)
+    _caption(start, stop, total)
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_cache import LRUCache
+from data_diagnostics import timed
+
+class ColumnIndex:
+    """Row-position index over one column.
+
+    Numeric columns keep their row positions sorted by value, so a range is two
+    binary searches. Other columns are dictionary-encoded with one inverted
+    list of positions per distinct value. Nulls are excluded from ranges and
+    kept as their own value for membership, matching `between`/`isin`.
+    """
+
+    def __init__(self, series):
+        self.numeric = pd.api.types.is_numeric_dtype(series)
+        if self.numeric:
+            self.row_values = series.to_numpy(dtype="float64", na_value=np.nan)
+            present = np.flatnonzero(~np.isnan(self.row_values))
+            self.positions = present[np.argsort(self.row_values[present], kind="stable")]
+            self.keys = self.row_values[self.positions]
+            self.nbytes = self.row_values.nbytes + self.positions.nbytes + self.keys.nbytes
+        else:
+            codes, uniques = series.factorize(use_na_sentinel=False)
+            self.codes = codes
+            self.values = uniques.tolist()
+            self.positions = np.argsort(codes, kind="stable")
+            self.offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(self.values)))])
+            self.nbytes = codes.nbytes + self.positions.nbytes + self.offsets.nbytes
+
+    def bounds(self):
+        """(min, max) of a numeric column, or None when it is all null."""
+        return (self.keys[0], self.keys[-1]) if len(self.keys) else None
+
+    def range(self, low, high):
+        """Positions with low <= value <= high, in value order."""
+        start = np.searchsorted(self.keys, low, side="left")
+        stop = np.searchsorted(self.keys, high, side="right")
+        return self.positions[start:stop]
+
+    def _codes(self, values):
+        wanted = set(values)
+        has_null = any(pd.isna(v) for v in values)
+        return [i for i, v in enumerate(self.values) if v in wanted or (has_null and pd.isna(v))]
+
+    def members(self, values):
+        """Positions whose value is in `values`."""
+        return np.concatenate([self.positions[self.offsets[c]:self.offsets[c + 1]]
+                               for c in self._codes(values)] or [np.empty(0, dtype=np.intp)])
+
+    def matches(self, positions, condition):
+        """Boolean mask telling which of `positions` satisfy condition (checked per row, O(k))."""
+        if self.numeric:
+            low, high = condition
+            values = self.row_values[positions]
+            return (values >= low) & (values <= high)
+        return np.isin(self.codes[positions], self._codes(condition))
+
+    def select(self, condition):
+        return self.range(*condition) if self.numeric else self.members(condition)
+
+@st.cache_resource(show_spinner=False)
+def index_cache():
+    """Column indexes keyed by column token: valid until that column (or the row set) changes."""
+    return LRUCache(max_entries=64, max_bytes=512 * 1024 ** 2, sizeof=lambda index: index.nbytes)
+
+def column_index(df, fingerprint, column):
+    """Builds the index for `column` on first use and reuses it for the same column token."""
+    token = fingerprint.column(column)
+    cache = index_cache()
+    index = cache.get(token)
+    if index is None:
+        index = cache.put(token, ColumnIndex(df[column]))
+    return index
+
+@timed("Indexed filter")
+def filter_positions(df, fingerprint, conditions):
+    """Sorted row positions matching every condition.
+
+    `conditions` maps a column to a (low, high) tuple for numeric columns or a
+    list of accepted values otherwise. The most selective index answers first;
+    the remaining conditions are checked only on its k candidate rows.
+    """
+    indexes = {col: column_index(df, fingerprint, col) for col in conditions}
+    candidates = {col: indexes[col].select(cond) for col, cond in conditions.items()}
+    first = min(candidates, key=lambda col: len(candidates[col]))
+    positions = candidates[first]
+    for col, cond in conditions.items():
+        if col != first and len(positions):
+            positions = positions[indexes[col].matches(positions, cond)]
+    return np.sort(positions)
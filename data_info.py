@@ -1,15 +1,17 @@
 import streamlit as st
 
+from data_metrics import null_counts
+
 def show_basic_info(df):
     st.subheader("📊 Data Preview")
     st.dataframe(df.head())
     
     st.write("**Current Shape:**", df.shape)
 
-def get_null_report(df):
+def get_null_report(df, fingerprint):
     st.subheader("🔍 Missing Data Report")
-    null_counts = df.isnull().sum()
-    null_df = null_counts[null_counts > 0]
+    counts = null_counts(df, fingerprint)
+    null_df = counts[counts > 0]
     
     if not null_df.empty:
         st.table(null_df)
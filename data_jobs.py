@@ -0,0 +1,232 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import streamlit as st
+
+from data_diagnostics import measure, record
+
+JOB_WORKERS = int(os.environ.get("ANALYTICA_JOB_WORKERS", min(4, os.cpu_count() or 1)))
+# Set ANALYTICA_JOB_PROCESSES=0 to run every job on threads (e.g. where spawning is not allowed)
+JOB_PROCESSES = os.environ.get("ANALYTICA_JOB_PROCESSES", "1") != "0"
+POLL_SECONDS = 1.0
+
+class JobCancelled(Exception):
+    """Raised inside a job by its progress callback once cancellation is requested."""
+
+class Progress:
+    """Callback handed to a job as `progress(fraction, message)`; picklable for worker processes."""
+
+    def __init__(self, job_id, updates, cancel):
+        self.job_id = job_id
+        self.updates = updates
+        self.cancel = cancel
+
+    def __call__(self, fraction, message=""):
+        if self.cancel.is_set():
+            raise JobCancelled()
+        self.updates.put((self.job_id, float(fraction), message))
+
+def _call(func, args, kwargs, progress):
+    # Top-level so worker processes can unpickle it
+    if progress is not None:
+        kwargs = dict(kwargs, progress=progress)
+    return func(*args, **kwargs)
+
+class Job:
+    """Handle on one submitted job; lives in the app process only."""
+
+    def __init__(self, job_id, label, future, cancel, key=None):
+        self.id = job_id
+        self.label = label
+        self.key = key
+        self.future = future
+        self.progress = 0.0
+        self.message = "Queued..."
+        self.started = time.time()
+        self.finished = None
+        self.cancelled = False
+        self._cancel = cancel
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self.finished = time.time()
+
+    @property
+    def status(self):
+        if self.cancelled or self.future.cancelled():
+            return "cancelled"
+        if not self.future.done():
+            return "running" if self.future.running() else "queued"
+        if isinstance(self.future.exception(), JobCancelled):
+            return "cancelled"
+        return "failed" if self.future.exception() is not None else "done"
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def cancel(self):
+        """Drops a queued job; a running one stops at its next progress report.
+
+        Jobs that never report progress run to completion in the pool, but
+        their result is discarded.
+        """
+        self.cancelled = True
+        self._cancel.set()
+        self.future.cancel()
+
+    def result(self):
+        return self.future.result()
+
+class JobRunner:
+    """Process pool (plus a thread pool) with a local progress queue.
+
+    Process jobs receive pickled arguments and return picklable results, so
+    they suit pure functions over a frame. Thread jobs share this process's
+    memory and caches, so they suit work that reads or fills those caches.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, processes=JOB_PROCESSES):
+        self.max_workers = max_workers
+        self.use_processes = processes
+        self._threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analytica-job")
+        self._processes = None
+        self._manager = None
+        self._updates = queue.Queue()
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _process_pool(self):
+        if self._processes is None:
+            # spawn: forking a threaded server process is unsafe
+            context = multiprocessing.get_context("spawn")
+            self._manager = context.Manager()
+            self._process_updates = self._manager.Queue()
+            self._processes = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        return self._processes
+
+    def submit(self, func, *args, label="", key=None, progress=False, threads=False, **kwargs):
+        """Schedules func(*args, **kwargs); with `progress=True` it also gets a Progress callback."""
+        with self._lock:
+            job_id = next(self._ids)
+            if threads or not self.use_processes:
+                pool, updates, cancel = self._threads, self._updates, threading.Event()
+            else:
+                pool = self._process_pool()
+                updates, cancel = self._process_updates, self._manager.Event()
+            callback = Progress(job_id, updates, cancel) if progress else None
+            job = Job(job_id, label, pool.submit(_call, func, args, kwargs, callback), cancel, key)
+            self._jobs[job_id] = job
+        return job
+
+    def poll(self):
+        """Applies queued progress reports to their jobs."""
+        sources = [self._updates] + ([self._process_updates] if self._processes is not None else [])
+        for updates in sources:
+            while True:
+                try:
+                    job_id, fraction, message = updates.get_nowait()
+                except queue.Empty:
+                    break
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    job.progress, job.message = fraction, message
+
+    def get(self, job_id):
+        self.poll()
+        return self._jobs.get(job_id)
+
+    def forget(self, job_id):
+        self._jobs.pop(job_id, None)
+
+@st.cache_resource(show_spinner=False)
+def job_runner():
+    """Process-wide runner; jobs outlive the script run (and page) that started them."""
+    return JobRunner()
+
+def _session_jobs():
+    return st.session_state.setdefault("jobs", {})
+
+def submit_job(slot, func, *args, label="", key=None, on_done=None, progress=False, threads=False, **kwargs):
+    """Starts a job for this session under `slot`, cancelling any previous job in that slot.
+
+    `key` identifies what the job computes (see running_job). `on_done(result)`
+    runs on a later script run of the same session, once the result is back;
+    see deliver_jobs().
+    """
+    current = session_job(slot)
+    if current is not None:
+        current.cancel()
+        job_runner().forget(current.id)
+    job = job_runner().submit(func, *args, label=label, key=key, progress=progress, threads=threads, **kwargs)
+    _session_jobs()[slot] = {"id": job.id, "on_done": on_done}
+    return job
+
+def session_job(slot):
+    entry = _session_jobs().get(slot)
+    return job_runner().get(entry["id"]) if entry else None
+
+def running_job(slot, key):
+    """The session's active job in `slot` if it is computing `key`, else None."""
+    job = session_job(slot)
+    return job if job is not None and job.active and job.key == key else None
+
+def stopped_job(slot, key):
+    """Whether the session's last job for `key` in `slot` failed or was cancelled (so it is not rerun by itself)."""
+    return st.session_state.get("stopped_jobs", {}).get(slot) == key
+
+def deliver_jobs():
+    """Hands finished results of this session to their on_done callbacks; returns failure messages."""
+    errors = []
+    runner = job_runner()
+    for slot, entry in list(_session_jobs().items()):
+        job = runner.get(entry["id"])
+        if job is None or job.active:
+            continue
+        del _session_jobs()[slot]
+        runner.forget(job.id)
+        if job.status != "done":
+            st.session_state.setdefault("stopped_jobs", {})[slot] = job.key
+        # Queue wait included: this is how long the user waited for the result
+        record(f"{job.label} ({job.status})", (job.finished or time.time()) - job.started, kind="job")
+        if job.status == "failed":
+            errors.append(f"{job.label} failed: {job.future.exception()}")
+        elif job.status == "done" and entry["on_done"] is not None:
+            try:
+                with measure(f"Deliver {job.label}"):
+                    entry["on_done"](job.result())
+            except Exception as e:
+                errors.append(f"{job.label} failed: {e}")
+    return errors
+
+def active_jobs():
+    jobs = [(slot, session_job(slot)) for slot in list(_session_jobs())]
+    return [(slot, job) for slot, job in jobs if job is not None and job.active]
+
+def _job_rows(jobs):
+    for slot, job in jobs:
+        elapsed = time.time() - job.started
+        st.progress(min(max(job.progress, 0.0), 1.0), text=f"{job.label}: {job.message} ({elapsed:,.0f}s)")
+        if st.button("✖️ Cancel", key=f"cancel_job_{slot}", use_container_width=True):
+            job.cancel()
+            st.rerun()
+
+@st.fragment(run_every=POLL_SECONDS)
+def _live_jobs_panel():
+    jobs = active_jobs()
+    if not jobs:
+        # Everything finished: rerun the app so results are delivered
+        st.rerun()
+    _job_rows(jobs)
+
+def jobs_panel():
+    """Progress bars and cancel buttons for this session's running jobs, refreshed while any run."""
+    if active_jobs():
+        st.markdown("### ⏳ Background Jobs")
+        _live_jobs_panel()
@@ -1,33 +1,316 @@
+import hashlib
+import importlib.util
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
 import streamlit as st
 import pandas as pd
 
-def upload_file():
-    uploaded_file = st.file_uploader("Import CSV or Excel file", type=['csv', 'xlsx'])
-    
+from data_backend import (DATA_DIR, OutOfCoreFrame, is_out_of_core, server_files, should_spill, spill_upload,
+                          spill_uploads)
+from data_compactor import COMPACT_ON_LOAD, compact_frame, memory_report, show_memory_report
+from data_diagnostics import measure, timed
+from data_shared import session_token, shared_store
+
+# Ingestion budget: rows/bytes beyond these limits are not parsed (None = unlimited)
+MAX_ROWS = None
+MAX_BYTES = None
+CHUNK_ROWS = 200_000
+HASH_BLOCK = 8 * 1024 * 1024
+INGEST_WORKERS = min(8, os.cpu_count() or 1)
+# python-calamine is an optional extra: a much faster Excel reader than openpyxl
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") is not None else None
+ALL_SHEETS = "📚 All sheets (combined)"
+SOURCE_COLUMN = "source"
+
+@st.cache_resource(show_spinner=False)
+def ingest_executor():
+    """Parser pool for multi-file uploads; the C parser tokenizes without the GIL, so files parse in parallel."""
+    return ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="analytica-ingest")
+
+@timed("Hash upload")
+def file_fingerprint(uploaded_file):
+    """Content hash of an upload, read in blocks so the bytes are never duplicated."""
+    digest = hashlib.blake2b(digest_size=16)
+    uploaded_file.seek(0)
+    for block in iter(lambda: uploaded_file.read(HASH_BLOCK), b""):
+        digest.update(block)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+def _is_number(dtype):
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+def _align_chunk(chunk, dtypes):
+    """Casts a chunk to the dtypes inferred so far, widening them when the chunk disagrees.
+
+    Returns the columns that cannot be reconciled (numbers in one chunk, text
+    in another): those have to be read as text from the start.
+    """
+    conflicts = []
+    for col, dtype in dtypes.items():
+        if col not in chunk.columns or chunk[col].dtype == dtype:
+            continue
+        if _is_number(dtype) and _is_number(chunk[col].dtype):
+            # int chunk vs float column (or the reverse, once NaNs appear): settle on float
+            dtypes[col] = "float64"
+            chunk[col] = chunk[col].astype("float64")
+        else:
+            conflicts.append(col)
+    return conflicts
+
+def read_csv_chunked(source, total_bytes=None, max_rows=MAX_ROWS, max_bytes=MAX_BYTES,
+                     chunk_rows=CHUNK_ROWS, progress=None):
+    """Streams a CSV in row chunks, inferring dtypes from the first chunk.
+
+    A column that turns from numbers to text in a later chunk restarts the
+    read with that column pinned to text, so it holds the original strings
+    ("007" stays "007") as a whole-file pd.read_csv would give.
+    `progress` is an optional callable taking a fraction in [0, 1] and a message.
+    Returns the parsed frame and a flag telling whether the budget truncated it.
+    """
+    start, text_columns = source.tell() if hasattr(source, "seek") else None, {}
+    while True:
+        chunks, truncated, conflicts = _read_chunks(source, text_columns, total_bytes, max_rows, max_bytes,
+                                                    chunk_rows, progress)
+        if not conflicts:
+            break
+        text_columns.update(dict.fromkeys(conflicts, str))
+        if start is not None:
+            source.seek(start)
+    if not chunks:
+        return pd.DataFrame(), truncated
+
+    return pd.concat(chunks, ignore_index=True), truncated
+
+def _read_chunks(source, text_columns, total_bytes, max_rows, max_bytes, chunk_rows, progress):
+    """(chunks, truncated, conflicting columns) of one pass over the CSV; stops at the first conflict."""
+    chunks, dtypes, rows, truncated = [], None, 0, False
+    reader = pd.read_csv(source, chunksize=chunk_rows, low_memory=False, dtype=text_columns or None)
+
+    for chunk in reader:
+        if dtypes is None:
+            dtypes = chunk.dtypes.to_dict()
+        else:
+            conflicts = _align_chunk(chunk, dtypes)
+            if conflicts:
+                reader.close()
+                return [], False, conflicts
+
+        if max_rows is not None and rows + len(chunk) > max_rows:
+            chunk = chunk.iloc[:max_rows - rows]
+            truncated = True
+        chunks.append(chunk)
+        rows += len(chunk)
+
+        pos = source.tell() if hasattr(source, "tell") else None
+        if progress is not None and pos is not None and total_bytes:
+            progress(min(pos / total_bytes, 1.0), f"Parsed {rows:,} rows")
+        if truncated or (max_bytes is not None and pos is not None and pos >= max_bytes):
+            truncated = True
+            break
+
+    reader.close()
+    return chunks, truncated, []
+
+def combine_parts(parts, source_column=SOURCE_COLUMN):
+    """Stacks (label, frame) parts into one frame, matching columns by name.
+
+    A column missing from a part is null there; types that disagree across
+    parts are widened by pd.concat (ints and floats to float, mixed kinds to
+    object). With `source_column`, a categorical column records each row's part.
+    """
+    frames = [frame for _, frame in parts]
+    combined = pd.concat(frames, ignore_index=True, sort=False) if frames else pd.DataFrame()
+    if source_column and source_column not in combined.columns:
+        labels = list(dict.fromkeys(label for label, _ in parts))
+        codes = np.repeat([labels.index(label) for label, _ in parts], [len(frame) for frame in frames])
+        combined[source_column] = pd.Categorical.from_codes(codes, categories=labels)
+    return combined
+
+def _parse_part(uploaded_file, all_sheets, max_rows):
+    """[(label, frame)] for one upload: the CSV, or the first (or every) sheet of a workbook opened once."""
+    if uploaded_file.name.endswith('.csv'):
+        # The same reader as a single upload, so a file gets the same dtypes either way
+        return [(uploaded_file.name, read_csv_chunked(uploaded_file, max_rows=max_rows)[0])]
+    with pd.ExcelFile(uploaded_file, engine=EXCEL_ENGINE) as book:
+        sheets = book.sheet_names if all_sheets else book.sheet_names[:1]
+        frames = book.parse(sheet_name=sheets, nrows=max_rows)
+    return [(f"{uploaded_file.name}:{sheet}", frames[sheet]) for sheet in sheets]
+
+@timed("Parse uploads")
+def _parse_uploads(uploaded_files, all_sheets, source_column, max_rows):
+    """Parses several uploads concurrently, one task per file, and stacks them in upload order."""
+    if all(f.name.endswith('.csv') for f in uploaded_files) and should_spill(sum(f.size for f in uploaded_files)):
+        with st.spinner("Spilling to Parquet for out-of-core processing..."):
+            return spill_uploads(uploaded_files, source_column)
+
+    bar = st.progress(0.0, text=f"Parsing {len(uploaded_files)} files...")
+    futures = {ingest_executor().submit(_parse_part, f, all_sheets, max_rows): i
+               for i, f in enumerate(uploaded_files)}
+    parts = [None] * len(uploaded_files)
+    for done, future in enumerate(as_completed(futures), 1):
+        parts[futures[future]] = future.result()
+        bar.progress(done / len(futures), text=f"Parsed {done} of {len(futures)} files")
+    bar.empty()
+    with measure("Combine parts"):
+        return combine_parts([part for file_parts in parts for part in file_parts], source_column)
+
+def _open_workbook(uploaded_file):
+    """The upload's ExcelFile, opened once and kept until another file is uploaded."""
+    cached = st.session_state.get("workbook")
+    if cached is None or cached[0] != uploaded_file.file_id:
+        _close_workbook()
+        cached = (uploaded_file.file_id, pd.ExcelFile(uploaded_file, engine=EXCEL_ENGINE))
+        st.session_state.workbook = cached
+    return cached[1]
+
+def _close_workbook():
+    cached = st.session_state.pop("workbook", None)
+    if cached is not None:
+        cached[1].close()
+
+@timed("Parse upload")
+def _parse_upload(uploaded_file, sheet_name, max_rows, max_bytes, source_column=None):
+    if uploaded_file.name.endswith('.csv') and should_spill(uploaded_file.size):
+        # Too big for pandas: convert to Parquet once and query it in place
+        with st.spinner("Spilling to Parquet for out-of-core processing..."):
+            return spill_upload(uploaded_file)
+
+    if uploaded_file.name.endswith('.csv'):
+        bar = st.progress(0.0, text="Reading CSV...")
+        df, truncated = read_csv_chunked(
+            uploaded_file,
+            total_bytes=uploaded_file.size,
+            max_rows=max_rows,
+            max_bytes=max_bytes,
+            progress=lambda frac, msg: bar.progress(frac, text=msg),
+        )
+        bar.empty()
+        if truncated:
+            st.warning(f"File exceeds the ingestion budget; loaded the first {len(df):,} rows.")
+        return df
+
+    book = _open_workbook(uploaded_file)
+    if sheet_name == ALL_SHEETS:
+        frames = book.parse(sheet_name=book.sheet_names, nrows=max_rows)
+        return combine_parts([(sheet, frames[sheet]) for sheet in book.sheet_names], source_column)
+    return book.parse(sheet_name=sheet_name, nrows=max_rows)
+
+def _cached_fingerprints(uploaded_files):
+    """Hashes each upload once; reruns with the same uploads reuse the digests."""
+    cached = st.session_state.get("ingest_hashes", {})
+    st.session_state.ingest_hashes = hashes = {
+        f.file_id: cached.get(f.file_id) or file_fingerprint(f) for f in uploaded_files}
+    return tuple(hashes[f.file_id] for f in uploaded_files)
+
+@timed("Load server file")
+def _load_server_file(name, max_rows):
+    path = os.path.join(DATA_DIR, name)
+    if should_spill(os.path.getsize(path)):
+        with st.spinner("Spilling to Parquet for out-of-core processing..."):
+            return OutOfCoreFrame.from_file(path)
+    if name.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, nrows=max_rows)
+
+def _prepare(load, compact):
+    """Runs load(); compacts in-memory results and measures the savings."""
+    df = load()
+    report = None
+    if compact and not is_out_of_core(df):
+        with measure("Compact on load"):
+            compacted = compact_frame(df)
+        report, df = memory_report(df, compacted), compacted
+    return {"df": df, "report": report}
+
+def _cached_load(key, load, compact):
+    """Loads each distinct content once per server: sessions opening the same file share one frame."""
+    cache = st.session_state.get("ingest_cache")
+    if cache is None or cache["key"] != key:
+        store, token = shared_store(), session_token()
+        store.release(token, keep=key)
+        st.session_state.ingest_cache = cache = {"key": key, **store.acquire(key, token, lambda: _prepare(load, compact))}
+    if cache["report"] is not None:
+        show_memory_report(cache["report"], title="🗜️ Loaded")
+    if is_out_of_core(cache["df"]):
+        st.caption(f"🦆 Out-of-core: {len(cache['df']):,} rows queried from disk with DuckDB.")
+    others = shared_store().sessions(key) - 1
+    if others > 0:
+        st.caption(f"♻️ Shared in memory with {others} other session{'s' if others > 1 else ''}.")
+    return cache["df"]
+
+def upload_file(max_rows=MAX_ROWS, max_bytes=MAX_BYTES):
+    uploaded_files = st.file_uploader("Import CSV or Excel files", type=['csv', 'xlsx'], accept_multiple_files=True)
+    uploaded_file = uploaded_files[0] if len(uploaded_files) == 1 else None
+    server = server_files()
+    server_file = st.selectbox("Or open a file on the server:", [None] + server, key="server_file") \
+        if server and not uploaded_files else None
+    compact = st.checkbox("🗜️ Compact column types on load", value=COMPACT_ON_LOAD, key="compact_on_load",
+                          help="Downcast numbers, store repetitive text as categories and other text as Arrow strings.")
+
+    if server_file is not None:
+        try:
+            mtime = os.path.getmtime(os.path.join(DATA_DIR, server_file))
+            return _cached_load(("server", server_file, mtime, max_rows, compact),
+                                lambda: _load_server_file(server_file, max_rows), compact)
+        except Exception as e:
+            st.error(f"Error loading file: {e}")
+            return None
+
+    # Several files: parsed in parallel and stacked into one table
+    if len(uploaded_files) > 1:
+        _close_workbook()
+        try:
+            all_sheets = st.checkbox("📚 Read every sheet of each workbook", key="ingest_all_sheets") \
+                if any(not f.name.endswith('.csv') for f in uploaded_files) else False
+            source = _source_column()
+            key = (_cached_fingerprints(uploaded_files), all_sheets, source, max_rows, compact)
+            return _cached_load(key, lambda: _parse_uploads(uploaded_files, all_sheets, source, max_rows), compact)
+        except Exception as e:
+            st.error(f"Error loading files: {e}")
+            return None
+
     # Check if a file has actually been uploaded first
     if uploaded_file is not None:
         try:
+            selected_sheet, source = None, None
             # Now it is safe to check the name attribute
-            if uploaded_file.name.endswith('.csv'):
-                return pd.read_csv(uploaded_file)
-            
-            else:
-                excel_file = pd.ExcelFile(uploaded_file)
-                sheet_names = excel_file.sheet_names
-                
+            if not uploaded_file.name.endswith('.csv'):
+                # Opened once: the same workbook lists the sheets and parses them
+                sheet_names = _open_workbook(uploaded_file).sheet_names
+
                 if len(sheet_names) > 1:
                     selected_sheet = st.selectbox(
                         "Select Sheet:",
-                        sheet_names
+                        sheet_names + [ALL_SHEETS]
                     )
+                    if selected_sheet == ALL_SHEETS:
+                        source = _source_column()
                 else:
                     selected_sheet = sheet_names[0]
-                
-                return pd.read_excel(uploaded_file, sheet_name=selected_sheet)
-                
+            else:
+                _close_workbook()
+
+            # Parse once per session: reruns with the same content reuse the cached frame
+            key = (_cached_fingerprints([uploaded_file]), selected_sheet, source, max_rows, max_bytes, compact)
+            return _cached_load(key, lambda: _parse_upload(uploaded_file, selected_sheet, max_rows, max_bytes, source),
+                                compact)
+
         except Exception as e:
             st.error(f"Error loading file: {e}")
             return None
-            
+
     # If no file is uploaded, just return None quietly
-    return None
\ No newline at end of file
+    if st.session_state.pop("ingest_cache", None) is not None:
+        shared_store().release(session_token())
+    st.session_state.pop("ingest_hashes", None)
+    _close_workbook()
+    return None
+
+def _source_column():
+    """SOURCE_COLUMN if the user wants each combined row labelled with its file or sheet, else None."""
+    keep = st.checkbox(f"🏷️ Add a '{SOURCE_COLUMN}' column naming each row's file or sheet", value=True,
+                       key="ingest_source")
+    return SOURCE_COLUMN if keep else None
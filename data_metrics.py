@@ -0,0 +1,119 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_backend import is_out_of_core
+from data_cache import LRUCache
+from data_diagnostics import timed
+
+METRIC_WORKERS = min(8, os.cpu_count() or 1)
+# Multiplier folding column hashes into one row hash (order-sensitive, wraps mod 2**64)
+_ROW_HASH_MULT = np.uint64(1_000_003)
+
+@st.cache_resource(show_spinner=False)
+def metrics_cache():
+    """(null count, row-hash array) per column token, plus per-version duplicate counts."""
+    return LRUCache(max_entries=512, max_bytes=512 * 1024 ** 2,
+                    sizeof=lambda value: value[1].nbytes if isinstance(value, tuple) else 64)
+
+@st.cache_resource(show_spinner=False)
+def metrics_executor():
+    """Worker pool for first-time column scans."""
+    return ThreadPoolExecutor(max_workers=METRIC_WORKERS, thread_name_prefix="analytica-metrics")
+
+def hash_column(series):
+    """One uint64 per row; equal values hash equal, nulls included."""
+    try:
+        return pd.util.hash_pandas_object(series, index=False).to_numpy()
+    except TypeError:
+        # Unhashable cells (lists, dicts) are compared by their text form
+        return pd.util.hash_pandas_object(series.astype(str), index=False).to_numpy()
+
+def _scan(series):
+    return int(series.isna().sum()), hash_column(series)
+
+def column_metrics(df, fingerprint):
+    """{column: (null count, row hashes)}, scanning only columns whose token is new.
+
+    Columns an operation did not rewrite keep their token, so after a single
+    clean or convert step only that column is read again. Cold columns (after
+    an upload or a row-changing step) are scanned in parallel.
+    """
+    cache = metrics_cache()
+    metrics, missing = {}, []
+    for col in df.columns:
+        cached = cache.get(fingerprint.column(col))
+        if cached is None:
+            missing.append(col)
+        else:
+            metrics[col] = cached
+    if len(missing) > 1:
+        scans = metrics_executor().map(_scan, [df[col] for col in missing])
+    else:
+        scans = map(_scan, [df[col] for col in missing])
+    for col, scanned in zip(missing, scans):
+        metrics[col] = cache.put(fingerprint.column(col), scanned)
+    return metrics
+
+@timed("Null counts")
+def null_counts(df, fingerprint):
+    """Same as df.isnull().sum(), maintained per column token."""
+    if is_out_of_core(df):
+        return _per_version(("nulls", fingerprint.key), df.null_counts)
+    metrics = column_metrics(df, fingerprint)
+    return pd.Series({col: metrics[col][0] for col in df.columns}, index=df.columns, dtype="int64")
+
+def row_hashes(df, fingerprint):
+    """Combines the cached column hashes into one hash per row."""
+    metrics = column_metrics(df, fingerprint)
+    rows = np.zeros(len(df), dtype=np.uint64)
+    for col in df.columns:
+        rows *= _ROW_HASH_MULT
+        rows ^= metrics[col][1]
+    return rows
+
+def _same(series, rows, leaders):
+    """Whether every row holds the same value as its leader in this column (nulls match nulls)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        return bool((codes[rows] == codes[leaders]).all())
+    # Through the extension array: nullable (Int64, string[pyarrow]) comparisons give NA, not False
+    a, b = series.array[rows], series.array[leaders]
+    equal = pd.array(a == b, dtype="boolean").to_numpy(dtype=bool, na_value=False)
+    return bool((equal | (a.isna() & b.isna())).all())
+
+@timed("Duplicate count")
+def duplicate_count(df, fingerprint):
+    """Same as df.duplicated().sum().
+
+    Every row whose hash was seen before is checked against the first row with
+    that hash, one column at a time. Only a genuine hash collision falls back
+    to pandas, and then only on the rows sharing a hash.
+    """
+    if is_out_of_core(df):
+        return _per_version(("dupes", fingerprint.key), df.duplicate_count)
+    def count():
+        if df.shape[1] == 0:
+            return 0
+        codes, uniques = pd.factorize(row_hashes(df, fingerprint))
+        if len(uniques) == len(df):
+            return 0
+        # Codes number hashes in order of first appearance
+        seen = np.maximum.accumulate(np.concatenate([[-1], codes[:-1]]))
+        leaders = np.flatnonzero(codes > seen)[codes]
+        rows = np.flatnonzero(leaders != np.arange(len(df)))
+        if all(_same(df[col], rows, leaders[rows]) for col in df.columns):
+            return len(rows)
+        shared = np.flatnonzero(np.bincount(codes)[codes] > 1)
+        return int(df.iloc[shared].duplicated().sum())
+    return _per_version(("dupes", fingerprint.key), count)
+
+def _per_version(key, compute):
+    cache = metrics_cache()
+    value = cache.get(key)
+    if value is None:
+        value = cache.put(key, compute())
+    return value
@@ -0,0 +1,218 @@
+"""Pure frame operations behind the workflow steps: no widgets, no session state.
+
+The app, the pipeline log and the batch runner all call these; each returns a
+new frame and never modifies its input.
+"""
+import numpy as np
+import pandas as pd
+
+from data_compactor import compact_series
+
+# --- Cleaning ---
+STRATEGIES = ["Delete Row", "Forward Fill", "Backward Fill", "Fill with Mean", "Fill with Median",
+              "Fill with Mode", "Fill with Constant", "Group-wise Fill"]
+
+def _mode(series):
+    modes = series.mode()
+    return modes.iat[0] if len(modes) else np.nan
+
+def _widen(series):
+    # Nullable (compacted) integers cannot hold a fractional fill value
+    if pd.api.types.is_integer_dtype(series) and series.hasnans:
+        return series.astype("float64")
+    return series
+
+def _holding(series, value):
+    """`series` in an integer dtype wide enough for the integer `value`.
+
+    Compacted columns (e.g. Int8) would otherwise wrap a larger fill value
+    around silently. Nullable columns stay nullable; past 64 bits, float64.
+    """
+    if not pd.api.types.is_integer_dtype(series) or not series.hasnans:
+        return series
+    nullable = isinstance(series.dtype, pd.api.extensions.ExtensionDtype)
+    dtype = series.dtype.numpy_dtype if nullable else series.dtype
+    info = np.iinfo(dtype)
+    if info.min <= value <= info.max:
+        return series
+    target = np.result_type(dtype, np.min_scalar_type(int(value)))
+    if target.kind not in "iu":
+        return series.astype("float64")
+    return series.astype(target.name.replace("uint", "UInt").replace("int", "Int") if nullable else target)
+
+def fill_column(df, column, strategy, value=None, by=None):
+    """Filled copy of one column of df (every strategy except 'Delete Row')."""
+    series = df[column]
+    numeric = pd.api.types.is_numeric_dtype(series)
+    if strategy == "Forward Fill":
+        filled = series.ffill()
+    elif strategy == "Backward Fill":
+        filled = series.bfill()
+    elif strategy in ("Fill with Mean", "Fill with Median"):
+        if not numeric:
+            return series
+        series = _widen(series)
+        filled = series.fillna(series.mean() if strategy == "Fill with Mean" else series.median())
+    elif strategy == "Fill with Mode":
+        filled = series.fillna(_mode(series))
+    elif strategy == "Fill with Constant":
+        if numeric:
+            value = pd.to_numeric(value)
+            series = _holding(series, value) if float(value).is_integer() else _widen(series)
+        elif isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+            series = series.cat.add_categories([value])
+        filled = series.fillna(value)
+    elif strategy == "Group-wise Fill":
+        # Mean of the row's group for numbers, most frequent value of the group otherwise
+        if numeric:
+            series = _widen(series)
+            filled = series.fillna(series.groupby(df[by], observed=True).transform("mean"))
+        else:
+            filled = series.fillna(df[by].map(series.groupby(df[by], observed=True).agg(_mode)))
+    else:
+        raise ValueError(f"Unknown cleaning strategy '{strategy}'")
+
+    # Keep filled text columns homogeneous strings
+    if filled.dtype == 'object':
+        filled = filled.astype(str)
+    return filled
+
+def apply_cleaning_plan(df, plan):
+    """Applies per-column strategies in one pass and returns a new frame.
+
+    `plan` is a list of {"column", "strategy", optional "value"/"by"} steps. Rows
+    are dropped once for all 'Delete Row' columns, then every fill is computed
+    on the kept rows. df itself is never modified.
+    """
+    drop = [step["column"] for step in plan if step["strategy"] == "Delete Row"]
+    if drop:
+        df = df.dropna(subset=drop).reset_index(drop=True)
+    fills = {step["column"]: fill_column(df, **step) for step in plan if step["strategy"] != "Delete Row"}
+    if not fills:
+        return df
+    out = df.copy(deep=False)
+    for column, filled in fills.items():
+        out[column] = filled
+    return out
+
+def apply_cleaning(df, column, strategy, value=None, by=None):
+    """Executes one null-handling strategy on one column."""
+    return apply_cleaning_plan(df, [{"column": column, "strategy": strategy, "value": value, "by": by}])
+
+def default_plan(df, columns):
+    """'Clean all' defaults: median for numbers, forward fill for dates, mode for everything else."""
+    def strategy(col):
+        if pd.api.types.is_numeric_dtype(df.dtypes[col]) and not pd.api.types.is_bool_dtype(df.dtypes[col]):
+            return "Fill with Median"
+        if pd.api.types.is_datetime64_any_dtype(df.dtypes[col]):
+            return "Forward Fill"
+        return "Fill with Mode"
+    return [{"column": col, "strategy": strategy(col)} for col in columns]
+
+def remove_duplicates(df):
+    """Drops fully duplicated rows."""
+    return df.drop_duplicates().reset_index(drop=True)
+
+# --- Reshaping ---
+# Aggregates that, over a single value, are that value (count and sum are handled below)
+UNSTACK_AGGFUNCS = ("mean", "min", "max", "sum", "count")
+
+def _small_codes(codes, size):
+    """Category codes in the narrowest integer type that can index `size` categories."""
+    for dtype in ("int8", "int16", "int32"):
+        if size < np.iinfo(dtype).max:
+            return codes.astype(dtype, copy=False)
+    return codes
+
+def _repeat_column(series, times):
+    """`series` stacked `times` times. Text and categories repeat only their small codes."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return pd.Categorical.from_codes(np.tile(series.cat.codes.to_numpy(), times), dtype=series.dtype)
+    if series.dtype == object:
+        try:
+            codes, uniques = pd.factorize(series)
+        except TypeError:
+            # Unhashable cells (lists, dicts) cannot be dictionary-encoded
+            return np.tile(series.to_numpy(), times)
+        return pd.Categorical.from_codes(np.tile(_small_codes(codes, len(uniques)), times), categories=uniques)
+    if isinstance(series.dtype, np.dtype):
+        return np.tile(series.to_numpy(), times)
+    return pd.concat([series] * times, ignore_index=True).array
+
+def melt_frame(df, id_vars, value_vars, var_name, value_name):
+    """Wide to long, same rows and order as pd.melt with a smaller result.
+
+    The variable column is a categorical (one small code per row instead of a
+    repeated string). Text id columns become categoricals too, so each id is
+    stored once however many columns are melted. Values are stacked straight
+    into the result without intermediate frames.
+    """
+    if var_name == value_name:
+        raise ValueError(f"'{var_name}' cannot name both the variable and the value column")
+    id_vars, value_vars = list(id_vars), list(value_vars)
+    if not value_vars or value_name in df.columns or var_name in id_vars or df.columns.nlevels > 1:
+        # Unusual requests keep pandas' own checks and messages
+        return pd.melt(df, id_vars=id_vars, value_vars=value_vars, var_name=var_name, value_name=value_name)
+    times = len(value_vars)
+    columns = {col: _repeat_column(df[col], times) for col in id_vars}
+    codes = np.repeat(_small_codes(np.arange(times), times), len(df))
+    columns[var_name] = pd.Categorical.from_codes(codes, categories=pd.Index(value_vars, dtype=object))
+    columns[value_name] = pd.concat([df[col] for col in value_vars], ignore_index=True)
+    return pd.DataFrame(columns, copy=False)
+
+def _unstack_pivot(df, index, columns, values, aggfunc):
+    """pivot_table's result via unstack when no cell needs aggregating, else None."""
+    if aggfunc not in UNSTACK_AGGFUNCS or not pd.api.types.is_numeric_dtype(df[values]) \
+            or pd.api.types.is_bool_dtype(df[values]):
+        return None
+    data = df[[index, columns, values]].dropna(subset=[index, columns])
+    if data.empty:
+        return None
+    # Cells get the dtype pivot_table's groupby would give them (e.g. sum of int8 is int64)
+    sample = data[values].head(2)
+    dtype = sample.groupby(np.zeros(len(sample))).agg(aggfunc).dtype
+    if aggfunc == "count":
+        data[values] = data[values].notna()
+    elif aggfunc == "sum":
+        data[values] = data[values].fillna(0)
+    else:
+        # A cell holding only nulls is dropped, as pivot_table drops all-null groups
+        data = data.dropna(subset=[values])
+    data[values] = data[values].astype(dtype)
+    try:
+        table = data.set_index([index, columns])[values].unstack(columns)
+    except ValueError:
+        # A repeated (index, columns) pair: the cells need pivot_table's aggregation after all
+        return None
+    # Categorical keys unstack every category; pivot_table keeps only observed ones
+    return table.dropna(how="all").dropna(axis=1, how="all")
+
+def pivot_frame(df, index, columns, values, aggfunc, unique=False):
+    """Long to wide, aggregating repeated cells with aggfunc.
+
+    `unique=True` tells that every (index, columns) pair is expected to occur
+    at most once (e.g. pivoting a melted table back): there is nothing to
+    aggregate, so the values are unstacked directly instead of going through
+    pivot_table's groupby. A wrong hint only costs the attempt.
+    """
+    table = _unstack_pivot(df, index, columns, values, aggfunc) if unique else None
+    if table is None:
+        table = df.pivot_table(index=index, columns=columns, values=values, aggfunc=aggfunc, observed=True)
+    return table.reset_index()
+
+# --- Types ---
+def convert_column(df, column, new_type):
+    """Returns a copy of df with one column cast to new_type."""
+    if new_type == "datetime64[ns]":
+        converted = pd.to_datetime(df[column])
+    elif new_type == "auto":
+        # Narrowest lossless dtype for this column
+        converted = compact_series(df[column])
+    else:
+        converted = df[column].astype(new_type)
+    return df.assign(**{column: converted})
+
+# --- Summaries ---
+def summary_pivot(df, rows, cols, values, agg_func):
+    """The pivot table behind the summary report (pandas path)."""
+    return df.pivot_table(index=rows, columns=cols if cols else None, values=values, aggfunc=agg_func)
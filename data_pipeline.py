@@ -0,0 +1,177 @@
+import json
+
+from data_backend import is_out_of_core
+from data_compactor import compact_frame
+from data_diagnostics import measure, timed
+from data_operations import (apply_cleaning, apply_cleaning_plan, convert_column, melt_frame,
+                             pivot_frame, remove_duplicates)
+from data_store import SnapshotStore
+from data_version import DatasetVersion
+
+# Every step is a plain {"op": name, "params": {...}} dict, replayable on any frame
+OPERATIONS = {
+    "melt": melt_frame,
+    "pivot": pivot_frame,
+    "clean": apply_cleaning,
+    "clean_plan": apply_cleaning_plan,
+    "convert": convert_column,
+    "dedupe": remove_duplicates,
+    "compact": compact_frame,
+}
+
+# Columns each operation rewrites; None means rows changed, so every column is new
+EFFECTS = {
+    "melt": lambda p: None,
+    "pivot": lambda p: None,
+    "clean": lambda p: None if p["strategy"] == "Delete Row" else [p["column"]],
+    "clean_plan": lambda p: None if any(s["strategy"] == "Delete Row" for s in p["plan"])
+                            else [s["column"] for s in p["plan"]],
+    "convert": lambda p: [p["column"]],
+    "dedupe": lambda p: None,
+    "compact": lambda p: None,
+}
+
+CHECKPOINT_EVERY = 3
+LOG_FORMAT = 1
+
+def run_operation(df, op):
+    """Applies a single operation and returns the resulting frame."""
+    if op["op"] not in OPERATIONS:
+        raise ValueError(f"Unknown operation '{op['op']}'")
+    with measure(describe(op), kind="operation"):
+        if is_out_of_core(df):
+            return df.run_operation(op)
+        return OPERATIONS[op["op"]](df, **op.get("params", {}))
+
+def describe(op):
+    """Human readable label for the history list."""
+    p = op.get("params", {})
+    if op["op"] == "melt":
+        return f"Melt {len(p['value_vars'])} columns into '{p['var_name']}'"
+    if op["op"] == "pivot":
+        return f"Pivot '{p['columns']}' by '{p['index']}' ({p['aggfunc']})"
+    if op["op"] == "clean":
+        return f"Clean '{p['column']}' ({p['strategy']})"
+    if op["op"] == "clean_plan":
+        return f"Clean {len(p['plan'])} columns (batch)"
+    if op["op"] == "convert":
+        return f"Convert '{p['column']}' to {p['new_type']}"
+    if op["op"] == "dedupe":
+        return "Remove duplicate rows"
+    if op["op"] == "compact":
+        return "Compact column types"
+    return op["op"]
+
+def replay(df, steps):
+    """Runs a list of operations (or an exported log) headless against df."""
+    if isinstance(steps, dict):
+        steps = steps["steps"]
+    for op in steps:
+        df = run_operation(df, op)
+    return df
+
+def parse_log(text):
+    """Reads an exported log back into a list of operations."""
+    log = json.loads(text)
+    if log.get("format") != LOG_FORMAT:
+        raise ValueError("Unsupported pipeline log format")
+    unknown = {op["op"] for op in log["steps"]} - OPERATIONS.keys()
+    if unknown:
+        raise ValueError(f"Unknown operations in log: {sorted(unknown)}")
+    return log["steps"]
+
+class Pipeline:
+    """Operation log over an uploaded frame, evaluated lazily.
+
+    Only the base frame and the frame at the cursor live in memory. Every
+    `checkpoint_every` steps the result is spilled to a SnapshotStore, so moving
+    the cursor backwards replays at most that many operations from disk.
+    """
+
+    def __init__(self, base, checkpoint_every=CHECKPOINT_EVERY):
+        self.base = base
+        self.checkpoint_every = checkpoint_every
+        self.steps = []
+        self.cursor = 0
+        self.current = base
+        # One DatasetVersion per step result; caches key off these instead of the data
+        self._versions = [DatasetVersion.initial(base)]
+        self._checkpoints = SnapshotStore()
+        # Out-of-core results already live on disk, so each one is its own checkpoint
+        self._spilled = {}
+
+    def apply(self, op, result=None):
+        """Runs op on the current frame (unless its `result` was computed elsewhere), discarding any redo tail."""
+        if result is None:
+            result = run_operation(self.current, op)
+        self._truncate(self.cursor)
+        self.steps.append({"op": op["op"], "params": op.get("params", {})})
+        self._versions.append(self.fingerprint.bump(result, EFFECTS[op["op"]](op.get("params", {}))))
+        self.cursor += 1
+        self.current = result
+        if is_out_of_core(result):
+            self._spilled[self.cursor] = result
+        elif self.cursor % self.checkpoint_every == 0:
+            tokens = [self.fingerprint.column(col) for col in result.columns]
+            self._checkpoints.put(self.cursor, result, column_keys=tokens)
+        return result
+
+    @timed("Move pipeline cursor")
+    def goto(self, position):
+        """Moves the cursor to any step between 0 (the upload) and len(steps)."""
+        position = max(0, min(position, len(self.steps)))
+        if position == self.cursor:
+            return self.current
+        saved = [k for k in list(self._checkpoints.keys()) + list(self._spilled) if k <= position]
+        start = max(saved + ([self.cursor] if self.cursor < position else []), default=0)
+        if start == self.cursor:
+            df = self.current
+        elif start in self._spilled:
+            df = self._spilled[start]
+        else:
+            df = self._checkpoints.get(start) if start else self.base
+        self.current = replay(df, self.steps[start:position])
+        self.cursor = position
+        return self.current
+
+    def undo(self):
+        return self.goto(self.cursor - 1)
+
+    def redo(self):
+        return self.goto(self.cursor + 1)
+
+    def reset(self):
+        self._truncate(0)
+        self.cursor = 0
+        self.current = self.base
+
+    @property
+    def fingerprint(self):
+        """DatasetVersion (per-column tokens) of the frame under the cursor."""
+        return self._versions[self.cursor]
+
+    @property
+    def version(self):
+        """Key identifying the frame under the cursor."""
+        return self.fingerprint.key
+
+    def labels(self):
+        return ["0. Original upload"] + [f"{i}. {describe(op)}" for i, op in enumerate(self.steps, 1)]
+
+    def to_json(self):
+        """Exports the active steps (up to the cursor) as a replayable log."""
+        return json.dumps({"format": LOG_FORMAT, "steps": self.steps[:self.cursor]},
+                          indent=2, default=str)
+
+    def _truncate(self, position):
+        del self.steps[position:]
+        del self._versions[position + 1:]
+        for key in [k for k in self._checkpoints.keys() if k > position]:
+            self._checkpoints.discard(key)
+        for key in [k for k in self._spilled if k > position]:
+            frame = self._spilled.pop(key)
+            # Dropped steps can never be reached again: free their Parquet files now, unless the
+            # frame is shared with a kept step or the base (e.g. 'compact' returns its input)
+            kept = [self.base, self.current, *self._spilled.values()]
+            if not any(frame is other for other in kept):
+                frame.discard()
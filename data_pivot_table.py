@@ -1,7 +1,15 @@
 import streamlit as st
-import pandas as pd
 
-def create_pivot_table(df):
+from data_aggregator import aggregation_cube, supports
+from data_backend import is_out_of_core
+from data_grid import show_grid
+from data_jobs import running_job, submit_job
+from data_operations import summary_pivot
+
+def _store_pivot(table):
+    st.session_state.current_pivot = table
+
+def create_pivot_table(df, version):
     st.header("📊 Pivot Table Summary")
     # st.info("Summaries created here are stored in memory and won't affect your raw data.")
 
@@ -17,29 +25,30 @@ def create_pivot_table(df):
         agg_func = st.selectbox("Aggregation Method:", 
                                  ["sum", "mean", "count", "min", "max"], key="piv_agg_sel")
 
-    # 2. Generation Logic
-    if st.button("Generate Summary Report", type="primary"):
+    # 2. Generation Logic: runs as a background job, the result lands in session_state
+    key = (version, tuple(rows), tuple(cols), tuple(values), agg_func)
+    if running_job("summary", key) is not None:
+        st.info("⏳ Building the summary in the background; progress is in the sidebar.")
+    elif st.button("Generate Summary Report", type="primary"):
         if not rows or not values:
             st.warning("Please select at least one Row and one Value column.")
         else:
-            try:
-                # Store the result in session_state instead of a local variable
-                st.session_state.current_pivot = df.pivot_table(
-                    index=rows, 
-                    columns=cols if cols else None, 
-                    values=values, 
-                    aggfunc=agg_func
-                )
-                st.success("Summary Generated!")
-            except Exception as e:
-                st.error(f"Could not generate pivot table: {e}")
+            if not is_out_of_core(df) and supports(df, values):
+                # Served from cached group statistics (shared with this process): no rescan
+                # when only the method changes
+                submit_job("summary", aggregation_cube().pivot, df, version, rows, cols, values, agg_func,
+                           key=key, label="Summary Report", on_done=_store_pivot, threads=True)
+            else:
+                submit_job("summary", summary_pivot, df, rows, cols, values, agg_func, key=key,
+                           label="Summary Report", on_done=_store_pivot, threads=is_out_of_core(df))
+            st.rerun()
 
     # 3. Persistent Display Logic
     # This block ensures the table stays visible even after switching tabs
     if "current_pivot" in st.session_state:
         st.divider()
         st.subheader("📋 Last Generated Summary")
-        st.dataframe(st.session_state.current_pivot, use_container_width=True)
+        show_grid(st.session_state.current_pivot, key="pivot_grid")
         
         # Persistent Download Button
         csv_summary = st.session_state.current_pivot.to_csv().encode('utf-8')
@@ -0,0 +1,209 @@
+import html
+
+import numpy as np
+import pandas as pd
+
+from data_compute import correlation
+
+TOP_K = 10
+HIST_BINS = 20
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+# Quantiles/histograms are exact up to this many values, reservoir-sampled beyond
+SAMPLE_CAP = 1_000_000
+MAX_CORR_COLS = 100
+
+def _kind(series):
+    if pd.api.types.is_bool_dtype(series):
+        return "Boolean"
+    if pd.api.types.is_numeric_dtype(series):
+        return "Numeric"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "DateTime"
+    return "Categorical"
+
+class ColumnProfile:
+    """Streaming summary of one column: call update() per chunk, then result()."""
+
+    def __init__(self, name, kind, seed=0):
+        self.name, self.kind = name, kind
+        self.rows = self.missing = 0
+        self.counts = None
+        # Chan et al. parallel moments: count, mean, M2
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+        self.min = self.max = None
+        self.zeros = self.infinite = 0
+        self._sample = np.empty(0)
+        self._keys = np.empty(0)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        present = chunk.notna().to_numpy()
+        self.missing += int(len(chunk) - present.sum())
+        try:
+            counts = chunk.value_counts(dropna=True)
+        except TypeError:
+            # Unhashable cells (lists, dicts) are counted by their text form
+            counts = chunk.dropna().astype(str).value_counts()
+        counts = counts[counts > 0]     # categoricals also list unused categories
+        self.counts = counts if self.counts is None else self.counts.add(counts, fill_value=0)
+
+        if self.kind == "Numeric":
+            values = chunk.to_numpy(dtype="float64", na_value=np.nan)[present]
+            finite = np.isfinite(values)
+            self.infinite += int(len(values) - finite.sum())
+            self._update_numeric(values[finite])
+        elif self.kind == "DateTime":
+            self._update_numeric(pd.DatetimeIndex(chunk[present]).asi8.astype("float64"))
+
+    def _update_numeric(self, values):
+        if not len(values):
+            return
+        n, mean = len(values), values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.n * n / total
+        self.n = total
+        lo, hi = values.min(), values.max()
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+        self.zeros += int((values == 0).sum())
+
+        # Bottom-k reservoir: keep the SAMPLE_CAP values with the smallest random keys
+        keys = np.concatenate([self._keys, self._rng.random(n)])
+        sample = np.concatenate([self._sample, values])
+        if len(sample) > SAMPLE_CAP:
+            keep = np.argpartition(keys, SAMPLE_CAP)[:SAMPLE_CAP]
+            keys, sample = keys[keep], sample[keep]
+        self._keys, self._sample = keys, sample
+
+    def result(self, minimal=False):
+        counts = self.counts.sort_values(ascending=False) if self.counts is not None else pd.Series(dtype="int64")
+        distinct = len(counts)
+        kind = self.kind
+        if kind == "Categorical" and distinct > 50 and distinct > 0.5 * max(self.rows - self.missing, 1):
+            kind = "Text"
+        out = {
+            "name": self.name,
+            "kind": kind,
+            "rows": self.rows,
+            "missing": self.missing,
+            "distinct": distinct,
+            "top": list(zip(counts.index[:TOP_K].tolist(), counts.to_numpy()[:TOP_K].astype(int).tolist())),
+        }
+        if self.n and self.kind in ("Numeric", "DateTime"):
+            out.update({
+                "mean": self.mean,
+                "std": float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else 0.0,
+                "min": self.min,
+                "max": self.max,
+                "zeros": self.zeros,
+                "infinite": self.infinite,
+                "quantiles": dict(zip(QUANTILES, np.quantile(self._sample, QUANTILES).tolist())),
+            })
+            if not minimal:
+                hist, edges = np.histogram(self._sample, bins=HIST_BINS, range=(self.min, self.max))
+                out["histogram"] = (hist * (self.n / len(self._sample)), edges)
+            if self.kind == "DateTime":
+                for key in ("mean", "min", "max"):
+                    out[key] = pd.Timestamp(int(out[key]))
+                out["std"] = pd.Timedelta(int(out["std"]))
+                out["quantiles"] = {q: pd.Timestamp(int(v)) for q, v in out["quantiles"].items()}
+        return out
+
+def profile_frame(df, minimal=False, chunk_rows=None, progress=None):
+    """Single pass per column over df (optionally in row chunks)."""
+    report = progress or (lambda frac, msg: None)
+    chunk_rows = chunk_rows or max(len(df), 1)
+    columns = [ColumnProfile(df.columns[i], _kind(df.iloc[:, i]), seed=i) for i in range(df.shape[1])]
+
+    starts = range(0, max(len(df), 1), chunk_rows)
+    for step, start in enumerate(starts, 1):
+        chunk = df.iloc[start:start + chunk_rows]
+        for i, col in enumerate(columns):
+            col.update(chunk.iloc[:, i])
+        report(0.8 * step / len(starts), f"Profiled {min(start + chunk_rows, len(df)):,} rows")
+
+    variables = [col.result(minimal) for col in columns]
+    correlations = None
+    numeric = [i for i, col in enumerate(columns) if col.kind == "Numeric"][:MAX_CORR_COLS]
+    if not minimal and len(numeric) > 1:
+        report(0.85, "Computing correlations...")
+        correlations = correlation(df.iloc[:, numeric])
+
+    report(1.0, "Done")
+    return {
+        "rows": len(df),
+        "columns": df.shape[1],
+        "missing_cells": sum(v["missing"] for v in variables),
+        "memory": int(df.memory_usage(deep=False).sum()),
+        "variables": variables,
+        "correlations": correlations,
+    }
+
+# --- HTML rendering ---
+def _fmt(value):
+    if isinstance(value, float):
+        return f"{value:,.4g}"
+    if isinstance(value, (int, np.integer)):
+        return f"{value:,}"
+    return html.escape(str(value))
+
+def _histogram_svg(counts, width=320, height=90):
+    peak = max(counts.max(), 1)
+    bar = width / len(counts)
+    rects = "".join(
+        f'<rect x="{i * bar:.1f}" y="{height - h:.1f}" width="{bar - 1:.1f}" height="{h:.1f}"/>'
+        for i, h in enumerate(counts / peak * height)
+    )
+    return f'<svg width="{width}" height="{height}" fill="#4A90E2">{rects}</svg>'
+
+def _variable_html(v):
+    rows = [("Type", v["kind"]), ("Missing", f"{v['missing']:,} ({v['missing'] / max(v['rows'], 1):.1%})"),
+            ("Distinct", f"{v['distinct']:,}")]
+    if "mean" in v:
+        rows += [("Mean", v["mean"]), ("Std", v["std"]), ("Min", v["min"]), ("Max", v["max"]),
+                 ("Zeros", v["zeros"])]
+        rows += [(f"P{int(q * 100)}", val) for q, val in v["quantiles"].items()]
+    stats = "".join(f"<tr><th>{k}</th><td>{_fmt(val)}</td></tr>" for k, val in rows)
+
+    if "histogram" in v:
+        detail = _histogram_svg(v["histogram"][0])
+    else:
+        top = "".join(f"<tr><td>{_fmt(val)}</td><td>{cnt:,}</td></tr>" for val, cnt in v["top"])
+        detail = f"<table><tr><th>Top values</th><th>Count</th></tr>{top}</table>"
+
+    return (f'<div class="var"><h3>{html.escape(str(v["name"]))}</h3>'
+            f'<div class="row"><table>{stats}</table>{detail}</div></div>')
+
+def _correlation_html(corr):
+    header = "".join(f"<th>{html.escape(str(c))}</th>" for c in corr.columns)
+    body = ""
+    for name, row in corr.iterrows():
+        cells = ""
+        for val in row:
+            shade = "#eee" if np.isnan(val) else (
+                f"rgba(214,39,40,{abs(val):.2f})" if val < 0 else f"rgba(31,119,180,{abs(val):.2f})")
+            cells += f'<td style="background:{shade}">{"" if np.isnan(val) else f"{val:.2f}"}</td>'
+        body += f"<tr><th>{html.escape(str(name))}</th>{cells}</tr>"
+    return f'<h2>Correlations (Pearson)</h2><table class="corr"><tr><th></th>{header}</tr>{body}</table>'
+
+def render_html(profile, title="Data Audit"):
+    """Compact standalone HTML report."""
+    overview = (f"<table><tr><th>Rows</th><td>{profile['rows']:,}</td></tr>"
+                f"<tr><th>Columns</th><td>{profile['columns']:,}</td></tr>"
+                f"<tr><th>Missing cells</th><td>{profile['missing_cells']:,}</td></tr>"
+                f"<tr><th>Memory</th><td>{profile['memory'] / 1e6:,.1f} MB</td></tr></table>")
+    variables = "".join(_variable_html(v) for v in profile["variables"])
+    corr = _correlation_html(profile["correlations"]) if profile["correlations"] is not None else ""
+    return f"""<html><head><meta charset="utf-8"><style>
+body {{ font-family: sans-serif; color: #222; }}
+table {{ border-collapse: collapse; margin: 4px 16px 4px 0; font-size: 13px; }}
+th, td {{ padding: 2px 8px; text-align: left; border-bottom: 1px solid #eee; }}
+.var {{ border: 1px solid #ddd; border-radius: 6px; padding: 6px 12px; margin: 10px 0; }}
+.row {{ display: flex; align-items: flex-start; flex-wrap: wrap; }}
+.corr td {{ text-align: center; min-width: 36px; }}
+</style></head><body><h1>{html.escape(title)}</h1><h2>Overview</h2>{overview}
+<h2>Variables</h2>{variables}{corr}</body></html>"""
@@ -1,7 +1,39 @@
 import streamlit as st
-import pandas as pd
 
-def reshape_logic(df):
+from data_aggregator import aggregation_cube, shape_pivot, supports
+from data_backend import is_out_of_core
+
+# The pivot preview lays out at most this many rows and columns
+PREVIEW_ROWS = 10
+PREVIEW_COLUMNS = 50
+
+def pivot_preview(cube, df, version, index_col, columns_col, values_col, agg_func):
+    """First rows and columns of the pivot, unstacking only the groups they show.
+
+    Returns the preview and the full number of (rows, columns), so a pivot of
+    tens of thousands of keys each never builds its dense table just to show ten rows.
+    """
+    def first(labels, limit):
+        labels = labels.unique()
+        try:
+            labels = labels.sort_values()
+        except TypeError:
+            pass
+        return labels[:limit]
+
+    keys = sorted([index_col, columns_col], key=list(df.columns).index)
+    table = cube.aggregate(df, version, keys, [values_col], agg_func)
+    n_rows = table.index.get_level_values(index_col).nunique()
+    n_columns = table.index.get_level_values(columns_col).nunique()
+    rows = table.index.get_level_values(index_col)
+    table = table[rows.isin(first(rows, PREVIEW_ROWS))]
+    # Columns that have a value in the rows shown
+    columns = table.index.get_level_values(columns_col)
+    table = table[columns.isin(first(columns, PREVIEW_COLUMNS))]
+    return shape_pivot(table, [index_col], [columns_col]), (n_rows, n_columns)
+
+def reshape_logic(df, version):
+    """Reshaping UI; returns a 'melt' or 'pivot' operation when one is executed."""
     st.header("🔄 Structural Reshaping")
     
     # Using Tabs instead of Radio for a more modern navigation feel
@@ -32,9 +64,8 @@ def reshape_logic(df):
             val_name = c2.text_input("New 'Value' Header:", value="Value")
             
             if st.button("🚀 Execute Melt", use_container_width=True, type="primary"):
-                df_melted = pd.melt(df, id_vars=id_vars, value_vars=value_vars, 
-                                    var_name=var_name, value_name=val_name)
-                return df_melted
+                return {"op": "melt", "params": {"id_vars": id_vars, "value_vars": value_vars,
+                                                 "var_name": var_name, "value_name": val_name}}
 
     # --- PIVOT TAB ---
     with tab2:
@@ -52,12 +83,27 @@ def reshape_logic(df):
         
         agg_func = st.selectbox("Aggregation Method:", ["mean", "sum", "count", "max", "min"], help="How to handle multiple values for the same cell.")
 
-        if st.button("📊 Execute Pivot", use_container_width=True, type="primary"):
+        unique = False
+        if columns_col and values_col and not is_out_of_core(df) and supports(df, [values_col]):
+            # Cached group statistics make flipping the method instant
+            cube = aggregation_cube()
             try:
-                df_pivoted = df.pivot_table(index=index_col, columns=columns_col, 
-                                            values=values_col, aggfunc=agg_func).reset_index()
-                return df_pivoted
-            except Exception as e:
-                st.error(f"Pivoting failed: {e}")
-                
-    return df
+                preview, (n_rows, n_columns) = pivot_preview(cube, df, version, index_col, columns_col,
+                                                             values_col, agg_func)
+                st.caption(f"Preview ({len(preview):,} of {n_rows:,} rows, "
+                           f"{preview.shape[1]:,} of {n_columns:,} columns):")
+                st.dataframe(preview[values_col], use_container_width=True)
+                # From the same cached statistics, per group (no dense table): no cell holds two values,
+                # so the pivot can skip aggregating
+                keys = sorted([index_col, columns_col], key=list(df.columns).index)
+                unique = bool(cube.stats(df, version, keys, [values_col])[(values_col, "count")].max() <= 1)
+            except (MemoryError, ValueError, TypeError) as e:
+                st.warning(f"No preview for this combination: {e}")
+
+        if st.button("📊 Execute Pivot", use_container_width=True, type="primary"):
+            params = {"index": index_col, "columns": columns_col, "values": values_col, "aggfunc": agg_func}
+            if unique:
+                params["unique"] = True
+            return {"op": "pivot", "params": params}
+
+    return None
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import streamlit as st
+
+from data_backend import is_out_of_core
+from data_store import SnapshotStore
+
+# Loaded datasets kept in memory across all sessions; idle ones beyond this move to disk
+SHARED_MEMORY_BYTES = int(os.environ.get("ANALYTICA_SHARED_MEMORY", 2 * 1024 ** 3))
+# Idle datasets kept on disk (moved-out frames and out-of-core files); beyond this the oldest are dropped
+SHARED_DISK_BYTES = int(os.environ.get("ANALYTICA_SHARED_DISK", 8 * 1024 ** 3))
+
+class SessionToken:
+    """Stands for one browser session; the store only holds weak references to it,
+    so a session that goes away stops counting without any explicit release."""
+
+class SharedEntry:
+    def __init__(self, value):
+        self.value = value
+        self.sessions = weakref.WeakSet()
+        self.nbytes = _footprint(value["df"])
+        self.on_disk = False
+        self.last_used = time.time()
+
+def _footprint(df):
+    if df is None or is_out_of_core(df):
+        # Out-of-core frames live in their Parquet file
+        return 0
+    return int(df.memory_usage(deep=True).sum())
+
+class SharedDatasetStore:
+    """Process-wide, content-addressed store of loaded datasets.
+
+    Every session that opens the same content (same upload hash and load
+    options) gets the same frame object, parsed once. Sessions never modify it:
+    pipeline operations return new frames that share the untouched columns, so
+    each session's edits are its own copy-on-write overlay on the shared base.
+    Entries count the sessions holding them; when the memory budget is exceeded,
+    the least recently used entries no session holds are moved to memory-mapped
+    Arrow files and read back on the next request. When the idle entries on
+    disk exceed their own budget, the least recently used are forgotten and
+    their files deleted; the next request for them parses the upload again.
+    """
+
+    def __init__(self, budget=SHARED_MEMORY_BYTES, root=None, disk_budget=SHARED_DISK_BYTES):
+        self.budget = budget
+        self.disk_budget = disk_budget
+        self._entries = OrderedDict()
+        self._disk = SnapshotStore(root=root, compression="uncompressed")
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def acquire(self, key, session, load):
+        """The value stored under `key` (a dict holding "df"), running load() only if no session has it."""
+        with self._lock:
+            # Callers holding or waiting for the key's lock are counted, so _drop never removes it under them
+            slot = self._loading.setdefault(key, {"lock": threading.Lock(), "users": 0})
+            slot["users"] += 1
+        try:
+            # One parse per key: a second session opening the same file waits for the first
+            with slot["lock"]:
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        # Held entries are never evicted, so the reload below is safe
+                        entry.sessions.add(session)
+                if entry is None:
+                    entry = SharedEntry(load())
+                    entry.sessions.add(session)
+                elif entry.on_disk:
+                    entry.value = {**entry.value, "df": self._disk.get(key)}
+                    entry.on_disk = False
+                with self._lock:
+                    self._entries[key] = entry
+                    self._entries.move_to_end(key)
+                    entry.last_used = time.time()
+                    self._evict()
+                    return entry.value
+        finally:
+            with self._lock:
+                slot["users"] -= 1
+                # A failed load leaves no entry behind to keep the lock for
+                if not slot["users"] and key not in self._entries and self._loading.get(key) is slot:
+                    del self._loading[key]
+
+    def release(self, session, keep=None):
+        """Drops the session's hold on every entry except `keep`."""
+        with self._lock:
+            for key, entry in self._entries.items():
+                if key != keep:
+                    entry.sessions.discard(session)
+            self._evict()
+
+    def sessions(self, key):
+        entry = self._entries.get(key)
+        return len(entry.sessions) if entry else 0
+
+    @property
+    def nbytes(self):
+        """Bytes held in memory by shared frames."""
+        return sum(e.nbytes for e in self._entries.values() if not e.on_disk)
+
+    def _disk_size(self, key, entry):
+        if key in self._disk:
+            return entry.nbytes
+        df = entry.value["df"]
+        return df.nbytes if is_out_of_core(df) else 0
+
+    @property
+    def disk_bytes(self):
+        """Bytes of shared datasets on disk: moved-out frames and out-of-core files."""
+        return sum(self._disk_size(key, e) for key, e in self._entries.items())
+
+    def _drop(self, key):
+        """Forgets an entry no session holds; an out-of-core file goes with the last reference to its frame."""
+        del self._entries[key]
+        self._disk.discard(key)
+        slot = self._loading.get(key)
+        if slot is not None and not slot["users"]:
+            del self._loading[key]
+
+    def _evict(self):
+        for key, entry in list(self._entries.items()):
+            if self.nbytes <= self.budget:
+                break
+            if entry.on_disk or len(entry.sessions) or entry.nbytes == 0:
+                continue
+            if key not in self._disk:
+                self._disk.put(key, entry.value["df"])
+            entry.value = {**entry.value, "df": None}
+            entry.on_disk = True
+        for key, entry in list(self._entries.items()):
+            if self.disk_bytes <= self.disk_budget:
+                break
+            if not len(entry.sessions) and self._disk_size(key, entry):
+                self._drop(key)
+
+@st.cache_resource(show_spinner=False)
+def shared_store():
+    """One store per server process, shared by every session."""
+    return SharedDatasetStore()
+
+def session_token():
+    return st.session_state.setdefault("shared_token", SessionToken())
@@ -1,23 +1,38 @@
 import streamlit as st
 
-def show_stats(df):
+from data_compute import CORR_METHODS, NULL_MODES, correlation, describe_columns
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def describe_frame(_df, version, include=None):
+    return describe_columns(_df, include=include)
+
+@st.cache_data(max_entries=8, show_spinner="Computing correlations...")
+def correlation_matrix(_df, version, method="pearson", nulls="pairwise"):
+    """Correlation matrix over numeric columns, computed once per dataset version and options."""
+    return correlation(_df, method=method, nulls=nulls)
+
+def show_stats(df, version):
     st.subheader("🔢 Statistical Summary")
     
     # Overview of numerical columns
     st.write("**Numerical Description:**")
-    st.dataframe(df.describe())
+    st.dataframe(describe_frame(df, version))
     
     # Information on Categorical columns
     st.write("**Categorical Summary:**")
-    st.dataframe(df.describe(include=['object']))
+    # Counts and top values share a column, so show it as text
+    st.dataframe(describe_frame(df, version, include=['object', 'category', 'string']).astype(str))
 
-def show_correlations(df):
+def show_correlations(df, version):
     st.subheader("🔗 Feature Correlation")
     # Only calculate for numbers
-    numeric_df = df.select_dtypes(include=['number'])
-    if not numeric_df.empty:
-        corr = numeric_df.corr()
-        st.write("Pearson Correlation Matrix:")
+    c1, c2 = st.columns(2)
+    method = c1.radio("Method:", CORR_METHODS, horizontal=True, format_func=str.title)
+    nulls = c2.radio("Missing values:", NULL_MODES, horizontal=True,
+                     format_func=lambda m: "Pairwise-complete rows" if m == "pairwise" else "Complete rows only")
+    corr = correlation_matrix(df, version, method, nulls)
+    if not corr.empty:
+        st.write(f"{method.title()} Correlation Matrix:")
         st.dataframe(corr)
     else:
         st.warning("No numeric columns found for correlation analysis.")
\ No newline at end of file
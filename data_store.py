@@ -0,0 +1,136 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+import weakref
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+class SnapshotStore:
+    """On-disk dataframe snapshots: each one is a manifest of compressed column files.
+
+    Columns are content-addressed, so a column that did not change between two
+    snapshots is written once and shared by both (copy-on-write at column level).
+    Nothing is kept in memory except the manifests; frames are read back lazily.
+    """
+
+    def __init__(self, root=None, compression="zstd"):
+        self.compression = compression
+        self.root = tempfile.mkdtemp(prefix="analytica_snapshots_", dir=root)
+        self._manifests = {}
+        self._refs = {}  # column key -> number of manifests using it
+        # Remove the spill directory when the session drops the store
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.root, True)
+
+    def __len__(self):
+        return len(self._manifests)
+
+    def __contains__(self, key):
+        return key in self._manifests
+
+    def keys(self):
+        return self._manifests.keys()
+
+    def put(self, key, df, column_keys=None):
+        """Snapshots a dataframe under `key`, replacing any previous snapshot.
+
+        `column_keys` (e.g. DatasetVersion tokens) identify column contents
+        without hashing them; by default each column is hashed.
+        """
+        column_keys = column_keys or [None] * df.shape[1]
+        manifest = {
+            "columns": df.columns,
+            "keys": [self._write_column(df.iloc[:, i], column_keys[i]) for i in range(df.shape[1])],
+            "index": self._write_index(df.index),
+            "index_names": df.index.names,
+            "length": len(df),
+        }
+        # Write before releasing so columns shared with the old snapshot survive
+        self.discard(key)
+        self._manifests[key] = manifest
+
+    def get(self, key):
+        """Materializes the snapshot stored under `key`."""
+        return self._read(self._manifests[key])
+
+    def discard(self, key):
+        manifest = self._manifests.pop(key, None)
+        if manifest is not None:
+            self._release(manifest)
+
+    def clear(self):
+        for key in list(self._manifests):
+            self.discard(key)
+
+    # --- Column files ---
+    def _column_key(self, series):
+        try:
+            hashed = pd.util.hash_pandas_object(series, index=False).to_numpy()
+        except TypeError:
+            # Unhashable cells (lists, dicts): store privately, never shared
+            return uuid.uuid4().hex
+        digest = hashlib.blake2b(hashed.tobytes(), digest_size=16)
+        digest.update(repr(series.dtype).encode())
+        return digest.hexdigest()
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    def _write_column(self, series, key=None):
+        key = key or self._column_key(series)
+        if key not in self._refs:
+            frame = series.rename("v").to_frame()
+            try:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if isinstance(series.dtype, pd.StringDtype):
+                    # Arrow metadata keeps "string" but not its storage (python/pyarrow)
+                    table = table.replace_schema_metadata(
+                        {**table.schema.metadata, b"string_storage": series.dtype.storage.encode()})
+                feather.write_feather(table, self._path(key, "arrow"), compression=self.compression)
+            except (pa.ArrowException, TypeError, ValueError):
+                # Mixed-type object columns have no Arrow representation
+                frame.to_pickle(self._path(key, "pkl"), compression="gzip")
+            self._refs[key] = 0
+        self._refs[key] += 1
+        return key
+
+    def _read_column(self, key):
+        arrow_path = self._path(key, "arrow")
+        if os.path.exists(arrow_path):
+            table = feather.read_table(arrow_path, memory_map=True)
+            frame = table.to_pandas()
+            storage = (table.schema.metadata or {}).get(b"string_storage")
+            if storage:
+                frame["v"] = frame["v"].astype(pd.StringDtype(storage.decode()))
+        else:
+            frame = pd.read_pickle(self._path(key, "pkl"), compression="gzip")
+        return frame["v"]
+
+    def _write_index(self, index):
+        if isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1:
+            return []
+        return [self._write_column(pd.Series(index.get_level_values(i)))
+                for i in range(index.nlevels)]
+
+    def _read(self, manifest):
+        data = {i: self._read_column(key) for i, key in enumerate(manifest["keys"])}
+        df = pd.DataFrame(data, index=pd.RangeIndex(manifest["length"]))
+        df.columns = manifest["columns"]
+        if manifest["index"]:
+            levels = [self._read_column(key) for key in manifest["index"]]
+            df.index = pd.MultiIndex.from_arrays(levels, names=manifest["index_names"]) \
+                if len(levels) > 1 else pd.Index(levels[0], name=manifest["index_names"][0])
+        return df
+
+    def _release(self, manifest):
+        for key in manifest["keys"] + manifest["index"]:
+            self._refs[key] -= 1
+            if self._refs[key] == 0:
+                del self._refs[key]
+                for ext in ("arrow", "pkl"):
+                    path = self._path(key, ext)
+                    if os.path.exists(path):
+                        os.remove(path)
@@ -1,18 +1,30 @@
 import streamlit as st
-import pandas as pd
 
-def change_datatypes(df):
+from data_backend import CAST_SQL, is_out_of_core
+from data_compactor import COMPACT_TYPES, compaction_preview, show_memory_report
+
+def change_datatypes(df, version):
+    """Conversion UI; returns a 'convert' or 'compact' operation when the user confirms."""
     st.subheader("⚙️ Data Type Conversion")
     col = st.selectbox("Select column to convert:", df.columns)
-    new_type = st.radio("Convert to:", ["int64", "float64", "datetime64[ns]", "object"])
+    types = ["int64", "float64", "datetime64[ns]", "object"] + COMPACT_TYPES
+    if is_out_of_core(df):
+        # Casts run in DuckDB; pandas-only types (category, auto) are not offered
+        st.caption(f"Current type: {df.dtypes[col]}")
+        types = [t for t in types if t in CAST_SQL]
+    else:
+        st.caption(f"Current type: {df[col].dtype} ({df[col].memory_usage(deep=True, index=False) / 1e6:,.2f} MB)")
+    new_type = st.radio("Convert to:", types,
+                        horizontal=True, help="'auto' picks the narrowest type that loses no information.")
     
     if st.button("Convert Type"):
-        try:
-            if new_type == "datetime64[ns]":
-                df[col] = pd.to_datetime(df[col])
-            else:
-                df[col] = df[col].astype(new_type)
-            st.success(f"Converted {col} to {new_type}")
-        except Exception as e:
-            st.error(f"Transformation failed: {e}")
-    return df
\ No newline at end of file
+        return {"op": "convert", "params": {"column": col, "new_type": new_type}}
+    if is_out_of_core(df):
+        return None
+
+    st.divider()
+    st.subheader("🗜️ Memory Optimization")
+    show_memory_report(compaction_preview(df, version), title="Compacting all columns")
+    if st.button("🗜️ Compact All Columns"):
+        return {"op": "compact"}
+    return None
\ No newline at end of file
@@ -0,0 +1,50 @@
+import hashlib
+import uuid
+
+def new_token():
+    return uuid.uuid4().hex
+
+class DatasetVersion:
+    """Cheap identity for a dataframe state: one token per column plus a row token.
+
+    Tokens are never derived from the data. Whoever changes the frame calls
+    bump() with the columns it rewrote, so untouched columns keep their token
+    and caches can be keyed per column or per dataset without hashing values.
+    """
+
+    def __init__(self, columns, rows=None):
+        self.rows = rows or new_token()
+        self.columns = dict(columns)
+        digest = hashlib.blake2b(self.rows.encode(), digest_size=16)
+        for name, token in self.columns.items():
+            digest.update(repr(name).encode())
+            digest.update(token.encode())
+        self.key = digest.hexdigest()
+
+    @classmethod
+    def initial(cls, df):
+        return cls({col: new_token() for col in df.columns})
+
+    def bump(self, df, columns=None):
+        """Successor version for df; `columns=None` means rows changed, so every token is new."""
+        if columns is None:
+            return DatasetVersion.initial(df)
+        rewritten = set(columns)
+        return DatasetVersion(
+            {col: new_token() if col in rewritten or col not in self.columns else self.columns[col]
+             for col in df.columns},
+            self.rows,
+        )
+
+    def column(self, name):
+        """Fingerprint of a single column."""
+        return self.columns[name]
+
+    def __eq__(self, other):
+        return isinstance(other, DatasetVersion) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"DatasetVersion({self.key[:8]})"
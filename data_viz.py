@@ -1,3 +1,5 @@
+import io
+
 import streamlit as st
 import pandas as pd
 import seaborn as sns
@@ -5,18 +7,113 @@ import matplotlib.pyplot as plt
 import plotly.express as px
 import numpy as np
 
-def run_eda(df):
+from data_cache import LRUCache
+from data_compute import correlation
+from data_diagnostics import measure, timed
+from data_jobs import running_job, stopped_job, submit_job
+from data_density import (RASTER_THRESHOLD, VOXEL_BINS, BUBBLE_BINS, needs_aggregation,
+                          sample_rows, draw_density, binned_line, aggregate_points)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def column_roles(_df, version):
+    """Numeric, categorical and legend-friendly columns for a dataset version."""
+    num_cols = _df.select_dtypes(include=['number']).columns.tolist()
+    cat_cols = _df.select_dtypes(exclude=['number']).columns.tolist()
+    # Guardrail: Categories with < 15 unique values for better legends
+    legend_cols = [c for c in cat_cols if _df[c].nunique() < 15]
+    return num_cols, cat_cols, legend_cols
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def numeric_corr(_df, version, cols):
+    return correlation(_df[cols])
+
+def _chart_size(chart):
+    """PNG bytes, or the JSON a Plotly figure serializes to (its data lives in nested dicts)."""
+    if isinstance(chart, (bytes, bytearray)):
+        return len(chart)
+    return len(chart.to_json())
+
+@st.cache_resource(show_spinner=False)
+def chart_cache():
+    """Rendered charts keyed on (dataset version, chart spec), shared across reruns."""
+    return LRUCache(max_entries=32, max_bytes=128 * 1024 ** 2, sizeof=_chart_size)
+
+@timed("Render matplotlib chart")
+def render_png(draw):
+    """Runs `draw()` (which returns a Figure) and returns it as PNG bytes, closing every figure it opened."""
+    before = set(plt.get_fignums())
+    try:
+        buf = io.BytesIO()
+        draw().savefig(buf, format="png", bbox_inches="tight", dpi=200)
+        return buf.getvalue()
+    finally:
+        # Close whatever draw() opened, including figures from a failed draw
+        for num in set(plt.get_fignums()) - before:
+            plt.close(num)
+
+def show_figure(version, spec, draw):
+    """Displays a matplotlib chart, drawing it only on a cache miss.
+
+    `draw()` builds and returns a Figure; it is rendered to PNG once and closed
+    straight away, so reruns and revisited charts never hold live figures.
+    """
+    cache = chart_cache()
+    key = (version, spec)
+    png = cache.get(key)
+    if png is None:
+        png = cache.put(key, render_png(draw))
+    st.image(png, use_container_width=True)
+
+def pairplot_png(df, columns, hue):
+    sns.set_theme(style="whitegrid")
+    return render_png(lambda: sns.pairplot(df, vars=columns, hue=hue, plot_kws={'alpha':0.4, 's':20}).figure)
+
+def facet_png(df, x, y, facet):
+    sns.set_theme(style="whitegrid")
+    return render_png(lambda: sns.relplot(data=df, x=x, y=y, col=facet, col_wrap=3, height=4,
+                                          kind="scatter", alpha=0.5).figure)
+
+def show_figure_job(version, spec, render, df, *args):
+    """Like show_figure for slow charts: `render(df, *args)` runs as a background job returning PNG bytes."""
+    cache = chart_cache()
+    key = (version, spec)
+    png = cache.get(key)
+    if png is not None:
+        st.image(png, use_container_width=True)
+    elif running_job("chart", key) is not None:
+        st.info("⏳ Drawing this chart in the background; progress is in the sidebar.")
+    # A failed or cancelled chart is only redrawn on request
+    elif not stopped_job("chart", key) or st.button("🔁 Draw Chart Again"):
+        submit_job("chart", render, df, *args, key=key, label=f"Chart ({spec[0]})",
+                   on_done=lambda png: cache.put(key, png))
+        st.rerun()
+
+def show_plotly(version, spec, build):
+    """Displays a plotly chart, building (and aggregating for) it only on a cache miss."""
+    cache = chart_cache()
+    key = (version, spec)
+    fig = cache.get(key)
+    if fig is None:
+        with measure("Build Plotly figure"):
+            fig = cache.put(key, build())
+    with measure("Send Plotly chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
+def run_eda(df, version):
     st.header("🎯 Advanced Exploratory Discovery")
     
     # --- PERFORMANCE SETTINGS ---
     sns.set_theme(style="whitegrid")
-    plt.rcParams.update({'figure.max_open_warning': 0})
     
-    # Identify Column Types
-    num_cols = df.select_dtypes(include=['number']).columns.tolist()
-    cat_cols = df.select_dtypes(exclude=['number']).columns.tolist()
-    # Guardrail: Categories with < 15 unique values for better legends
-    legend_cols = [c for c in cat_cols if df[c].nunique() < 15]
+    # Identify Column Types (cached per dataset version)
+    num_cols, cat_cols, legend_cols = column_roles(df, version)
+
+    # Large frames: point charts are binned server-side so cost is bounded by pixels
+    aggregate = st.checkbox(f"⚡ Aggregate point charts above {RASTER_THRESHOLD:,} rows", value=True,
+                            key="eda_aggregate")
+    big = needs_aggregation(df, aggregate)
+    if big:
+        st.caption(f"{len(df):,} rows: scatter, line, 3D and bubble charts show density/binned aggregates.")
 
     tabs = st.tabs(["1. Univariate", "2. Bivariate", "3. Multivariate"])
 
@@ -24,33 +121,37 @@ def run_eda(df):
     with tabs[0]:
         st.subheader("Distribution & Frequency")
         col = st.selectbox("Select Column:", df.columns, key="u_col")
-        
-        fig, ax = plt.subplots(figsize=(10, 5))
-        
-        if pd.api.types.is_numeric_dtype(df[col]):
+        is_num = pd.api.types.is_numeric_dtype(df[col])
+        if is_num:
             u_chart = st.selectbox("Type:", ["Histogram", "Box Plot", "KDE"], key="u_num")
-            if u_chart == "Histogram": 
-                sns.histplot(df[col], kde=True, ax=ax, color='#4A90E2')
-            elif u_chart == "Box Plot": 
-                sns.boxplot(x=df[col], ax=ax, color='#F5A623')
-            else: 
-                sns.kdeplot(df[col], fill=True, ax=ax, color='#9013FE')
         else:
             u_chart = st.selectbox("Type:", ["Count Plot", "Pie Chart"], key="u_cat")
-            counts = df[col].value_counts().nlargest(10)
-            
-            if u_chart == "Count Plot":
-                sns.barplot(x=counts.index, y=counts.values, hue=counts.index, palette="viridis", legend=True, ax=ax)
-                # Adding Data Labels (Numbers)
-                for i, v in enumerate(counts.values):
-                    ax.text(i, v + (max(counts.values)*0.01), str(v), ha='center', fontweight='bold')
-                plt.xticks(rotation=45)
-            elif u_chart == "Pie Chart":
-                ax.pie(counts, labels=counts.index, autopct='%1.1f%%', startangle=140, colors=sns.color_palette("pastel"))
-            
-            ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-        
-        st.pyplot(fig)
+
+        def draw_univariate():
+            fig, ax = plt.subplots(figsize=(10, 5))
+            if is_num:
+                if u_chart == "Histogram": 
+                    sns.histplot(df[col], kde=True, ax=ax, color='#4A90E2')
+                elif u_chart == "Box Plot": 
+                    sns.boxplot(x=df[col], ax=ax, color='#F5A623')
+                else: 
+                    sns.kdeplot(df[col], fill=True, ax=ax, color='#9013FE')
+            else:
+                counts = df[col].value_counts().nlargest(10)
+                
+                if u_chart == "Count Plot":
+                    sns.barplot(x=counts.index, y=counts.values, hue=counts.index, palette="viridis", legend=True, ax=ax)
+                    # Adding Data Labels (Numbers)
+                    for i, v in enumerate(counts.values):
+                        ax.text(i, v + (max(counts.values)*0.01), str(v), ha='center', fontweight='bold')
+                    plt.xticks(rotation=45)
+                elif u_chart == "Pie Chart":
+                    ax.pie(counts, labels=counts.index, autopct='%1.1f%%', startangle=140, colors=sns.color_palette("pastel"))
+                
+                ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+            return fig
+
+        show_figure(version, ("univariate", col, u_chart), draw_univariate)
         
 
     # --- TAB 2: BIVARIATE ---
@@ -73,13 +174,31 @@ def run_eda(df):
             b_opts = ["Grouped Count Plot", "Heatmap (Crosstab)"]
 
         b_chart = st.selectbox("🛠️ Select Graph Type:", b_opts)
-        fig, ax = plt.subplots(figsize=(10, 6))
 
-        try:
-            if b_chart == "Scatter Plot": 
+        def draw_bivariate():
+            fig, ax = plt.subplots(figsize=(10, 6))
+            if b_chart == "Scatter Plot" and big:
+                image = draw_density(ax, df, bx, by)
+                plt.colorbar(image, ax=ax, label='log(1 + points)')
+                # Sampled overlay keeps the hue grouping visible
+                sns.scatterplot(data=sample_rows(df), x=bx, y=by, hue=bh, s=8, alpha=0.5, ax=ax)
+            elif b_chart == "Scatter Plot": 
                 sns.scatterplot(data=df, x=bx, y=by, hue=bh, alpha=0.6, ax=ax)
+            elif b_chart == "Line Plot" and big:
+                line = binned_line(df, bx, by, hue=bh)
+                for name, grp in (line.groupby(bh, observed=True) if bh else [(None, line)]):
+                    ax.plot(grp["x"], grp["mean"], label=name)
+                    ax.fill_between(grp["x"], grp["low"], grp["high"], alpha=0.2)
+                ax.set_xlabel(bx)
+                ax.set_ylabel(f"{by} (binned mean, min-max band)")
             elif b_chart == "Line Plot": 
                 sns.lineplot(data=df, x=bx, y=by, hue=bh, marker='o', ax=ax)
+            elif b_chart == "RegPlot" and big:
+                image = draw_density(ax, df, bx, by, cmap="Blues")
+                xy = df[[bx, by]].apply(pd.to_numeric, errors="coerce").dropna()
+                slope, intercept = np.polyfit(xy[bx], xy[by], 1)
+                grid = np.linspace(xy[bx].min(), xy[bx].max(), 100)
+                ax.plot(grid, slope * grid + intercept, color='red')
             elif b_chart == "RegPlot":
                 # Forced numeric conversion for trend calculation
                 sns.regplot(data=df, x=pd.to_numeric(df[bx]), y=pd.to_numeric(df[by]), ax=ax, line_kws={'color':'red'})
@@ -100,7 +219,10 @@ def run_eda(df):
 
             plt.xticks(rotation=45, ha='right')
             if bh or not is_x_n: ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-            st.pyplot(fig)
+            return fig
+
+        try:
+            show_figure(version, ("bivariate", bx, by, bh, b_chart, big), draw_bivariate)
         except Exception as e:
             st.error(f"⚠️ Error: {b_chart} failed. Check if X and Y columns are both numeric for this plot type.")
 
@@ -113,16 +235,19 @@ def run_eda(df):
             with c1:
                 st.subheader("Correlation Heatmap")
                 if len(num_cols) >= 2:
-                    fig, ax = plt.subplots()
-                    sns.heatmap(df[num_cols].corr(), annot=True, cmap='coolwarm', ax=ax)
-                    st.pyplot(fig)
+                    def draw_heatmap():
+                        fig, ax = plt.subplots()
+                        sns.heatmap(numeric_corr(df, version, num_cols), annot=True, cmap='coolwarm', ax=ax)
+                        return fig
+                    show_figure(version, ("corr_heatmap",), draw_heatmap)
             with c2:
                 st.subheader("Scatterplot Matrix (Pair Plot)")
                 sel = st.multiselect("Select Variables:", num_cols, default=num_cols[:3])
                 phue = st.selectbox("Color by:", [None] + legend_cols, key="m_phue")
                 if len(sel) > 1:
-                    g = sns.pairplot(df, vars=sel, hue=phue, plot_kws={'alpha':0.4, 's':20})
-                    st.pyplot(g.fig)
+                    # Only the plotted columns are shipped to the worker
+                    show_figure_job(version, ("pairplot", tuple(sel), phue), pairplot_png,
+                                    df[list(dict.fromkeys(sel + ([phue] if phue else [])))], sel, phue)
             
 
         elif m_tech == "3D & Bubble":
@@ -131,16 +256,40 @@ def run_eda(df):
                 c1, c2, c3, c4 = st.columns(4)
                 x3, y3, z3 = c1.selectbox("X:", num_cols), c2.selectbox("Y:", num_cols), c3.selectbox("Z:", num_cols)
                 h3 = c4.selectbox("Color:", [None] + legend_cols, key="h3d")
-                fig = px.scatter_3d(df, x=x3, y=y3, z=z3, color=h3, opacity=0.7, height=600)
-                st.plotly_chart(fig, use_container_width=True)
+                overlay = big and st.checkbox("Overlay sampled points for hover", key="ov3d")
+
+                def build_3d():
+                    if not big:
+                        return px.scatter_3d(df, x=x3, y=y3, z=z3, color=h3, opacity=0.7, height=600)
+                    # One marker per occupied voxel, sized by how many rows fall in it
+                    voxels = aggregate_points(df, [x3, y3, z3], VOXEL_BINS, hue=h3)
+                    fig = px.scatter_3d(voxels, x=x3, y=y3, z=z3, color=h3 or "count", size="count",
+                                        hover_data=["count"], opacity=0.7, height=600)
+                    if overlay:
+                        points = px.scatter_3d(sample_rows(df), x=x3, y=y3, z=z3, hover_data=df.columns)
+                        fig.add_traces(points.update_traces(marker=dict(size=2, color="black")).data)
+                    return fig
+
+                show_plotly(version, ("scatter_3d", x3, y3, z3, h3, big, overlay), build_3d)
                 
             else:
                 c1, c2, c3, c4 = st.columns(4)
                 xb, yb = c1.selectbox("X-Axis:", num_cols, key="xb"), c2.selectbox("Y-Axis:", num_cols, key="yb")
                 sb = c3.selectbox("Size (3rd Num):", num_cols, key="sb")
                 hb = c4.selectbox("Color (Hue):", [None] + legend_cols, key="hb")
-                fig = px.scatter(df, x=xb, y=yb, size=sb, color=hb, size_max=40, hover_data=df.columns)
-                st.plotly_chart(fig, use_container_width=True)
+                overlay = big and st.checkbox("Overlay sampled points for hover", key="ovbub")
+
+                def build_bubble():
+                    if not big:
+                        return px.scatter(df, x=xb, y=yb, size=sb, color=hb, size_max=40, hover_data=df.columns)
+                    cells = aggregate_points(df, [xb, yb], BUBBLE_BINS, hue=hb, measures=[sb])
+                    fig = px.scatter(cells, x=xb, y=yb, size=sb, color=hb, size_max=40, hover_data=["count"])
+                    if overlay:
+                        points = px.scatter(sample_rows(df), x=xb, y=yb, hover_data=df.columns)
+                        fig.add_traces(points.update_traces(marker=dict(size=3, color="black")).data)
+                    return fig
+
+                show_plotly(version, ("bubble", xb, yb, sb, hb, big, overlay), build_bubble)
                 
 
         elif m_tech == "Conditioning & Hierarchy":
@@ -149,21 +298,20 @@ def run_eda(df):
                 c1, c2, c3 = st.columns(3)
                 fx, fy = c1.selectbox("X:", num_cols, key="fx"), c2.selectbox("Y:", num_cols, key="fy")
                 fs = c3.selectbox("Facet by:", legend_cols, key="fs")
-                g = sns.relplot(data=df, x=fx, y=fy, col=fs, col_wrap=3, height=4, kind="scatter", alpha=0.5)
-                st.pyplot(g.fig)
+                show_figure_job(version, ("facet", fx, fy, fs), facet_png,
+                                df[list(dict.fromkeys(c for c in (fx, fy, fs) if c))], fx, fy, fs)
                 
             elif sub == "Treemap":
                 path = st.multiselect("Hierarchy Path:", cat_cols, default=cat_cols[:2] if len(cat_cols)>1 else cat_cols)
                 val = st.selectbox("Box Area (Numeric):", num_cols)
                 if path:
-                    fig = px.treemap(df, path=path, values=val, color=val, color_continuous_scale='RdYlGn')
-                    st.plotly_chart(fig, use_container_width=True)
+                    show_plotly(version, ("treemap", tuple(path), val),
+                                lambda: px.treemap(df, path=path, values=val, color=val, color_continuous_scale='RdYlGn'))
                 
             else:
                 path = st.multiselect("Hierarchy Path:", cat_cols, default=cat_cols[:2], key="sun_path")
                 val = st.selectbox("Sector Size:", num_cols, key="sun_val")
                 if path:
-                    fig = px.sunburst(df, path=path, values=val, color=val)
-
-                    st.plotly_chart(fig, use_container_width=True)
+                    show_plotly(version, ("sunburst", tuple(path), val),
+                                lambda: px.sunburst(df, path=path, values=val, color=val))
 